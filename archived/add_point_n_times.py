@@ -2,6 +2,8 @@ import sage
 import math
 from functools import lru_cache
 
+from conic_kernel import conic_mul_wnaf
+
 def add_point_4(r, s, t, u, delta, R):
   r, s, t, u, delta = R(r), R(s), R(t), R(u), R(delta) # R(2) inverse and multiply 
   two = R(2)
@@ -30,6 +32,13 @@ def add_point(r, s, t, u, d, R):
             
 
 def self_add_optimized(n,r,s, delta, R):
+  # Over Z/N on x^2 - delta*y^2 = 1: wNAF ladder on ints, negative digits
+  # add the inverse (x, -y). Other norms (primality_test's X^2 - delta*Y^2 = 4)
+  # have no such inverse under add_point and keep the binary method.
+  if R.characteristic() != 0 and R(r)**2 - R(delta)*R(s)**2 == 1:
+    N = int(R.characteristic())
+    x, y = conic_mul_wnaf(n, (int(R(r)), int(R(s))), int(R(delta)), N)
+    return (R(int(x)), R(int(y)))
   first_two_power = math.floor(math.log2(n))
   res = self_add_two_power_new(first_two_power, r, s, delta, R)
   n -= 2**first_two_power
@@ -0,0 +1,99 @@
+"""
+Product-tree batch gcd prefilter over a whole set of N (Bernstein).
+
+Before any group method runs, two cheap whole-corpus scans are made:
+- small factors: P = product of all primes <= bound is reduced modulo every
+  N with a remainder tree, then gcd(P mod N, N) exposes any prime <= bound
+- shared factors: with Q = product of all N, gcd((Q mod N^2) / N, N)
+  exposes every N that shares a prime with another N in the set
+Both cost quasi-linear time in the total size of the set.
+"""
+from math import gcd, prod
+
+from schedule import primes_up_to
+
+
+def product_tree(values):
+    """
+    Levels of the product tree, leaves first and the root level last
+    """
+    tree = [list(values)]
+    while len(tree[-1]) > 1:
+        level = tree[-1]
+        tree.append([prod(level[i:i + 2]) for i in range(0, len(level), 2)])
+    return tree
+
+
+def remainder_tree(value, tree, square=False):
+    """
+    value mod each leaf of tree (mod leaf^2 if square), walking down from the root
+    """
+    rems = [value]
+    for level in reversed(tree):
+        rems = [rems[i // 2] % (x*x if square else x) for i, x in enumerate(level)]
+    return rems
+
+
+def small_factors(Ns, bound):
+    """
+    {N: g} for every N with a prime factor g' <= bound (g = gcd(P, N))
+    """
+    if not Ns:
+        return {}
+    P = prod(product_tree(primes_up_to(bound))[-1]) if bound >= 2 else 1
+    rems = remainder_tree(P, product_tree(Ns))
+    found = {}
+    for N, r in zip(Ns, rems):
+        g = gcd(r, N)
+        if g != 1:
+            found[N] = g
+    return found
+
+
+def shared_factors(Ns):
+    """
+    {N: g} for every N sharing a prime with another N of the set
+    (g = N for repeated values or when both primes are shared)
+    """
+    if len(Ns) < 2:
+        return {}
+    tree = product_tree(Ns)
+    rems = remainder_tree(tree[-1][0], tree, square=True)
+    found = {}
+    for N, r in zip(Ns, rems):
+        g = gcd(r // N, N)
+        if g != 1:
+            found[N] = g
+    return found
+
+
+def sharing_pairs(flagged):
+    """
+    (N1, N2, gcd) for every pair of flagged N with a common factor.
+    Only the (few) N flagged by shared_factors need to be compared pairwise.
+    """
+    flagged = sorted(set(flagged))
+    pairs = []
+    for i, N1 in enumerate(flagged):
+        for N2 in flagged[i + 1:]:
+            g = gcd(N1, N2)
+            if g != 1:
+                pairs.append((N1, N2, g))
+    return pairs
+
+
+def prefilter(Ns, bound=2**16):
+    """
+    Tag every N of the set that the batch scans can split.
+    Returns (tags, pairs): tags maps N to (tag, factor) with tag
+    "small_factor" or "shared_factor", pairs lists (N1, N2, gcd) for the N
+    sharing a prime (a repeated N is tagged with factor N).
+    """
+    Ns = [int(N) for N in Ns]
+    tags = {}
+    for N, g in small_factors(Ns, bound).items():
+        tags[N] = ("small_factor", g)
+    shared = shared_factors(Ns)
+    for N, g in shared.items():
+        tags.setdefault(N, ("shared_factor", g))
+    return tags, sharing_pairs(shared)
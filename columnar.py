@@ -0,0 +1,318 @@
+"""
+Columnar experiment results stored as chunked .npz files.
+
+A results directory holds chunk_00000.npz, chunk_00001.npz, ... and every
+chunk carries the same columns:
+
+    N, p, q, factor   big integers, as little-endian uint8 rows padded to a
+                      multiple of 8 bytes (0 = unknown / no factor)
+    B, trial          int64 (-1 = unknown / no successful trial)
+    additions         int64 (-1 = not counted)
+    method            unicode
+    success           bool
+    elapsed           float64 seconds (nan = not timed)
+
+Rows are appended through ColumnarWriter and read back chunk by chunk, so
+summaries over millions of rows are a few vectorised numpy passes. The
+printed logs of the earlier runs (output/*.txt, result_files/experiment1.txt)
+are converted with import_logs:
+
+    python3 columnar.py <results dir> output/*.txt result_files/experiment1.txt
+"""
+import glob
+import os
+import re
+import sys
+
+import numpy as np
+
+BIG_COLUMNS = ("N", "p", "q", "factor")
+INT_COLUMNS = ("B", "trial", "additions")
+COLUMNS = ("N", "p", "q", "B", "method", "trial", "success", "factor", "additions", "elapsed")
+DEFAULTS = {"N": 0, "p": 0, "q": 0, "factor": 0, "B": -1, "trial": -1,
+            "additions": -1, "method": "", "success": False, "elapsed": float("nan")}
+
+
+def pack_ints(values):
+    """
+    Non-negative integers as a (len, 8*k) uint8 array, little-endian per row
+    """
+    values = [int(v) for v in values]
+    width = max([8] + [-(-v.bit_length() // 64) * 8 for v in values])
+    data = b"".join(v.to_bytes(width, "little") for v in values)
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(values), width)
+
+
+def unpack_ints(array):
+    """
+    Inverse of pack_ints: list of Python ints
+    """
+    return [int.from_bytes(row.tobytes(), "little") for row in array]
+
+
+def low_words(array):
+    """
+    Low 64 bits of every packed integer as uint64, exact for values < 2^64
+    """
+    return np.ascontiguousarray(array[:, :8]).view("<u8").ravel()
+
+
+def _pad(array, width):
+    if array.shape[1] == width:
+        return array
+    padded = np.zeros((array.shape[0], width), dtype=np.uint8)
+    padded[:, :array.shape[1]] = array
+    return padded
+
+
+def _chunk_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, "chunk_*.npz")))
+
+
+class ColumnarWriter:
+    """
+    Buffers rows and writes them out chunk_rows at a time.
+    Opening an existing directory appends new chunks after the present ones.
+    """
+
+    def __init__(self, directory, chunk_rows=1 << 16):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        os.makedirs(directory, exist_ok=True)
+        self._index = len(_chunk_paths(directory))
+        self._rows = {name: [] for name in COLUMNS}
+
+    def append(self, **row):
+        unknown = set(row) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}")
+        for name in COLUMNS:
+            value = row.get(name)
+            self._rows[name].append(DEFAULTS[name] if value is None else value)
+        if len(self._rows["N"]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        rows = self._rows
+        if not rows["N"]:
+            return
+        arrays = {name: pack_ints(rows[name]) for name in BIG_COLUMNS}
+        for name in INT_COLUMNS:
+            arrays[name] = np.array([int(v) for v in rows[name]], dtype=np.int64)
+        arrays["method"] = np.array([str(v) for v in rows["method"]], dtype=np.str_)
+        arrays["success"] = np.array([bool(v) for v in rows["success"]], dtype=np.bool_)
+        arrays["elapsed"] = np.array([float(v) for v in rows["elapsed"]], dtype=np.float64)
+        path = os.path.join(self.directory, f"chunk_{self._index:05d}.npz")
+        np.savez(path, **arrays)
+        self._index += 1
+        self._rows = {name: [] for name in COLUMNS}
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_chunks(directory, columns=COLUMNS):
+    """
+    Yield {column: array} for every chunk of the directory, in order
+    """
+    for path in _chunk_paths(directory):
+        with np.load(path) as chunk:
+            yield {name: chunk[name] for name in columns}
+
+
+def read_columns(directory, columns=COLUMNS):
+    """
+    Every chunk of the directory concatenated into one {column: array}
+    """
+    chunks = list(iter_chunks(directory, columns))
+    table = {}
+    for name in columns:
+        parts = [chunk[name] for chunk in chunks]
+        if name in BIG_COLUMNS:
+            width = max([8] + [part.shape[1] for part in parts])
+            table[name] = (np.concatenate([_pad(part, width) for part in parts])
+                           if parts else np.zeros((0, 8), dtype=np.uint8))
+        elif parts:
+            table[name] = np.concatenate(parts)
+        else:
+            table[name] = np.zeros(0, dtype=np.str_ if name == "method" else np.float64)
+    return table
+
+
+def success_summary(table, by=("method", "B")):
+    """
+    Group the rows by the given (non big integer) columns.
+    Returns [(key, runs, successes, mean trial of the successes)] sorted by key.
+    """
+    codes = np.zeros(len(table["success"]), dtype=np.int64)
+    uniques = []
+    for name in by:
+        values, inverse = np.unique(table[name], return_inverse=True)
+        codes = codes * len(values) + inverse.ravel()
+        uniques.append(values)
+    groups, inverse = np.unique(codes, return_inverse=True)
+    inverse = inverse.ravel()
+    runs = np.bincount(inverse, minlength=len(groups))
+    success = table["success"]
+    successes = np.bincount(inverse, weights=success, minlength=len(groups))
+    known = success & (table["trial"] >= 0)
+    trial_sum = np.bincount(inverse, weights=np.where(known, table["trial"], 0), minlength=len(groups))
+    trial_count = np.bincount(inverse, weights=known, minlength=len(groups))
+
+    summary = []
+    for g, code in enumerate(groups):
+        key = []
+        for values in reversed(uniques):
+            code, i = divmod(int(code), len(values))
+            key.append(values[i].item())
+        mean = float(trial_sum[g] / trial_count[g]) if trial_count[g] else float("nan")
+        summary.append((tuple(reversed(key)), int(runs[g]), int(successes[g]), mean))
+    return summary
+
+
+# Line formats of the printed logs
+_TEST = re.compile(r"^Test (\d+)/\d+")
+_N_PQ = re.compile(r"^N = (\d+) = (\d+) \* (\d+)")
+_B = re.compile(r"^B = (\d+)\s*$")
+_N_VALUES = re.compile(r"^N values \[(.*)\]")
+_SKIPPED = re.compile(r"^\s+Skipping N = (\d+):")
+_TESTING_METHOD = re.compile(r"^\s+Testing (Pell's|Pollard's|Williams') method")
+_SUCCESS = re.compile(r"^Success on trial (\d+), found factor: (\d+)")
+_FAILED = re.compile(r"^Failed after \d+ trials")
+_TESTING_NUMBER = re.compile(r"^Testing number: (\d+)(?: x (\d+))?\s*$")
+_PRIME_FACTORS = re.compile(r"^Prime factors: p=(\d+), q=(\d+)")
+_ATTEMPT = re.compile(r"^Attempt\s+\d+\s+B=\s*(\d+)")
+_P1_RESULT = re.compile(r"^(Conic|Original|ECM) p-1 (?:found factor: (\d+) in|failed after) (\d+) attempts"
+                        r"(?:,| and) (\d+) additions(?:, ([\d.]+)s)?")
+_REQUIRED = re.compile(r"^Conic factorization required (\d+) attempts")
+
+_LOG_METHODS = {"Pell's": "pell", "Pollard's": "pollard", "Williams'": "williams",
+                "Conic": "conic_p1", "Original": "p1_original", "ECM": "ecm_p1"}
+
+
+def parse_log(lines):
+    """
+    Stream the result rows out of the lines of a printed log.
+
+    Understands the experiment.sage / experiment2.sage printout and the
+    "Testing number: ..." printout of the archived p-1 experiments.
+    Values a log does not print (p, q, B, elapsed, ...) are left unknown.
+    experiment2 prints no line for a successful Williams run, so a method
+    header without an outcome line counts as a success of unknown trial.
+    """
+    N = p = q = None
+    B = None
+    attempt_B = None
+    N_list = []
+    pending = None
+
+    for line in lines:
+        line = line.rstrip("\n")
+
+        m = _SUCCESS.match(line)
+        if m and pending:
+            yield dict(N=N, p=p, q=q, B=B, method=pending, trial=int(m.group(1)),
+                       success=True, factor=int(m.group(2)))
+            pending = None
+            continue
+        if _FAILED.match(line) and pending:
+            yield dict(N=N, p=p, q=q, B=B, method=pending, success=False)
+            pending = None
+            continue
+        if pending:
+            yield dict(N=N, p=p, q=q, B=B, method=pending, success=True)
+            pending = None
+
+        m = _TESTING_METHOD.match(line)
+        if m:
+            pending = _LOG_METHODS[m.group(1)]
+            continue
+        m = _TEST.match(line)
+        if m:
+            # experiment2 only prints N once, as a list before the sweep
+            k = int(m.group(1))
+            N = N_list[k - 1] if k <= len(N_list) else None
+            p = q = attempt_B = None
+            continue
+        m = _N_PQ.match(line)
+        if m:
+            N, p, q = (int(v) for v in m.groups())
+            continue
+        m = _B.match(line)
+        if m:
+            B = int(m.group(1))
+            continue
+        m = _N_VALUES.match(line)
+        if m:
+            N_list = [int(v) for v in m.group(1).split(",") if v.strip()]
+            B = None
+            continue
+        m = _SKIPPED.match(line)
+        if m and int(m.group(1)) in N_list:
+            N_list.remove(int(m.group(1)))
+            continue
+        m = _TESTING_NUMBER.match(line)
+        if m:
+            if m.group(2):
+                p, q = int(m.group(1)), int(m.group(2))
+                N = p * q
+            else:
+                N, p, q = int(m.group(1)), None, None
+            B = attempt_B = None
+            continue
+        m = _PRIME_FACTORS.match(line)
+        if m:
+            p, q = int(m.group(1)), int(m.group(2))
+            continue
+        m = _ATTEMPT.match(line)
+        if m:
+            attempt_B = int(m.group(1))
+            continue
+        m = _P1_RESULT.match(line)
+        if m:
+            method = _LOG_METHODS[m.group(1)]
+            factor = m.group(2)
+            # only the conic p-1 attempts print their B
+            yield dict(N=N, p=p, q=q, B=attempt_B if method == "conic_p1" else None,
+                       method=method, trial=int(m.group(3)), success=factor is not None,
+                       factor=None if factor is None else int(factor), additions=int(m.group(4)),
+                       elapsed=None if m.group(5) is None else float(m.group(5)))
+            continue
+        m = _REQUIRED.match(line)
+        if m:
+            yield dict(N=N, p=p, q=q, method="conic_p1", trial=int(m.group(1)), success=True)
+            continue
+
+    if pending:
+        yield dict(N=N, p=p, q=q, B=B, method=pending, success=True)
+
+
+def import_logs(paths, directory, chunk_rows=1 << 16):
+    """
+    Convert printed logs into the results directory, one file at a time.
+    Returns the number of rows written.
+    """
+    count = 0
+    with ColumnarWriter(directory, chunk_rows) as writer:
+        for path in paths:
+            with open(path) as f:
+                for row in parse_log(f):
+                    writer.append(**row)
+                    count += 1
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python3 columnar.py <results dir> <log> [<log> ...]")
+        sys.exit(1)
+    rows = import_logs(sys.argv[2:], sys.argv[1])
+    print(f"Imported {rows} rows into {sys.argv[1]}")
+    for key, runs, successes, mean in success_summary(read_columns(sys.argv[1]), by=("method",)):
+        print(f"  {key[0]:<12} {successes}/{runs} successes, mean trial {mean:.2f}")
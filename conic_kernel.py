@@ -0,0 +1,152 @@
+"""
+Native-integer arithmetic on the Pell conic x^2 - d*y^2 = 1 over Z/NZ.
+
+Points are plain (x, y) tuples of Python ints, or gmpy2 mpz when gmpy2 is
+installed, reduced modulo N after every operation. This avoids the Sage
+element overhead of Integers(N) in the stage 1 inner loop.
+"""
+from functools import lru_cache
+
+try:
+    from gmpy2 import mpz
+except ImportError:
+    mpz = int
+
+
+def residue(v, N):
+    """
+    Convert v (int, Sage Integer or IntegerMod) to a reduced native residue mod N
+    """
+    return mpz(int(v) % int(N))
+
+
+def conic_add(P1, P2, d, N):
+    """
+    Add two points P1 = (r, s) and P2 = (t, u) on the conic
+    """
+    r, s = P1
+    t, u = P2
+    return (r*t + s*u*d) % N, (r*u + s*t) % N
+
+
+def conic_square(P, d, N):
+    """
+    Double a point: (x, y) + (x, y) = (x^2 + d*y^2, 2*x*y)
+    """
+    x, y = P
+    return (x*x + d*y*y) % N, 2*x*y % N
+
+
+def conic_mul(n, P, d, N):
+    """
+    Compute n*P with a left-to-right bit-scanning double-and-add ladder
+    """
+    n = int(n)
+    if n == 0:
+        return mpz(1), mpz(0)
+
+    x, y = P
+    rx, ry = x, y
+    for i in range(n.bit_length() - 2, -1, -1):
+        rx, ry = (rx*rx + d*ry*ry) % N, 2*rx*ry % N  # double
+        if (n >> i) & 1:
+            rx, ry = (rx*x + d*ry*y) % N, (rx*y + ry*x) % N  # add P
+    return rx, ry
+
+
+@lru_cache(maxsize=1 << 16)
+def wnaf(n, w=4):
+    """
+    Width-w non-adjacent form of n >= 0, least significant digit first.
+    Digits are 0 or odd with |digit| < 2^(w-1), and any w consecutive
+    digits hold at most one nonzero. Cached: the stage 1 prime powers are
+    the same for every trial.
+    """
+    n = int(n)
+    digits = []
+    while n > 0:
+        if n & 1:
+            digit = n & ((1 << w) - 1)
+            if digit >= 1 << (w - 1):
+                digit -= 1 << w
+            n -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        n >>= 1
+    return tuple(digits)
+
+
+def wnaf_width(n):
+    """
+    Window width for an n-bit scalar: the precomputed odd multiples only
+    pay off for long scalars
+    """
+    bits = int(n).bit_length()
+    return 3 if bits < 128 else 4 if bits < 512 else 5
+
+
+def conic_mul_wnaf(n, P, d, N, w=None):
+    """
+    Compute n*P from the wNAF digits of n. The odd multiples P, 3P, ...,
+    (2^(w-1) - 1)P are precomputed and a negative digit adds the inverse
+    (x, -y), which costs nothing on the conic. About one addition per w + 1
+    bits instead of one per 1-bit (w from wnaf_width when not given).
+    """
+    n = int(n)
+    if n == 0:
+        return mpz(1), mpz(0)
+    if w is None:
+        w = wnaf_width(n)
+
+    P2 = conic_square(P, d, N)
+    odd = [P]
+    for _ in range((1 << (w - 2)) - 1):
+        odd.append(conic_add(odd[-1], P2, d, N))
+
+    digits = wnaf(n, w)
+    rx, ry = odd[digits[-1] >> 1]  # the leading digit is positive
+    for digit in reversed(digits[:-1]):
+        rx, ry = (rx*rx + d*ry*ry) % N, 2*rx*ry % N  # double
+        if digit > 0:
+            x, y = odd[digit >> 1]
+            rx, ry = (rx*x + d*ry*y) % N, (rx*y + ry*x) % N  # add
+        elif digit < 0:
+            x, y = odd[-digit >> 1]
+            rx, ry = (rx*x - d*ry*y) % N, (ry*x - rx*y) % N  # add the inverse (x, -y)
+    return rx, ry
+
+
+def lucas_x_mul(n, x, N):
+    """
+    x-coordinate of n*P from x = x(P) alone, using the Lucas ladder
+    x_{2m} = 2*x_m^2 - 1 and x_{2m+1} = 2*x_m*x_{m+1} - x.
+    The pair (x_m, x_{m+1}) is carried through the bits of n, so y and d
+    are never needed.
+    """
+    n = int(n)
+    if n == 0:
+        return mpz(1)
+
+    x0, x1 = x, (2*x*x - 1) % N
+    for i in range(n.bit_length() - 2, -1, -1):
+        if (n >> i) & 1:
+            x0, x1 = (2*x0*x1 - x) % N, (2*x1*x1 - 1) % N
+        else:
+            x0, x1 = (2*x0*x0 - 1) % N, (2*x0*x1 - x) % N
+    return x0
+
+
+# x_{2m} and x_{m+k} from x_m, x_k, x_{m-k}
+X_DOUBLE, X_ADD = "(2*{a}*{a} - 1) % N", "(2*{a}*{b} - {c}) % N"
+
+
+def lucas_x_chain(n, x, N, chains):
+    """
+    x-coordinate of n*P for a prime power n = l^e, running the Lucas chain of
+    l from chains (a lucas_chains.ChainTable) e times instead of the ladder
+    """
+    chain, e = chains.function(n, X_DOUBLE, X_ADD, "N")
+    for _ in range(e):
+        x = chain(x, N)
+    return x
@@ -0,0 +1,86 @@
+"""
+Number of points on the Pell conic x^2 - D*y^2 = 4 modulo n, without
+enumerating (Z/n)^2 as archived/see_valid_points.py does.
+
+For n = p^k:
+- odd p, p not dividing D: 2 is invertible, so (x/2, y/2) runs over the
+  group x^2 - D*y^2 = 1, which has p^(k-1) * (p - (D/p)) points
+- odd p dividing D: x^2 = 4 + D*y^2 = 4 (mod p) has exactly two roots
+  lifting to p^k for every y, giving 2 * p^k points
+- p = 2: the solutions mod 2^k are enumerated by Hensel lifting the
+  solutions mod 2^(k-1), so only actual points are visited
+Counts are multiplicative over coprime moduli (CRT).
+"""
+import csv
+import sys
+
+from number_theory import factor_int, jacobi
+from schedule import primes_up_to
+
+
+def _two_adic_counts(D, max_k):
+    """
+    Point counts mod 2^k for k = 0..max_k, by lifting the solution set
+    """
+    counts = [1]
+    points = [(0, 0)]  # the single point mod 1
+    for k in range(1, max_k + 1):
+        step, mod = 1 << (k - 1), 1 << k
+        points = [(xl, yl)
+                  for x, y in points
+                  for xl in (x, x + step)
+                  for yl in (y, y + step)
+                  if (xl*xl - D*yl*yl - 4) % mod == 0]
+        counts.append(len(points))
+    return counts
+
+
+def prime_power_counts(D, p, max_k):
+    """
+    [points mod p^k for k = 0..max_k]
+    """
+    D, p = int(D), int(p)
+    if p == 2:
+        return _two_adic_counts(D, max_k)
+    s = jacobi(D % p, p)
+    if s == 0:
+        return [1] + [2 * p**k for k in range(1, max_k + 1)]
+    return [1] + [p**(k - 1) * (p - s) for k in range(1, max_k + 1)]
+
+
+def count_points(D, n):
+    """
+    Points on x^2 - D*y^2 = 4 mod n, multiplied out over the prime powers of n
+    """
+    total = 1
+    for p, k in factor_int(n).items():
+        total *= prime_power_counts(D, p, k)[k]
+    return total
+
+
+def point_table(D, primes, max_k):
+    """
+    Yield (p, [count mod p^k for k = 0..max_k]) for every p in primes
+    """
+    for p in primes:
+        yield p, prime_power_counts(D, p, max_k)
+
+
+def write_point_table(path, D, max_p, max_k):
+    """
+    Stream the table of prime_points.csv (Prime, 0, 1, ..., max_k) for all
+    primes p <= max_p to path
+    """
+    with open(path, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Prime"] + [str(k) for k in range(max_k + 1)])
+        for p, counts in point_table(D, primes_up_to(max_p), max_k):
+            writer.writerow([p] + counts)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print("usage: python3 conic_points.py <D> <max p> <max k> <csv path>")
+        sys.exit(1)
+    D, max_p, max_k = (int(v) for v in sys.argv[1:4])
+    write_point_table(sys.argv[4], D, max_p, max_k)
@@ -0,0 +1,171 @@
+"""
+Seeded semiprime corpora stored on disk, with p +- 1 and q +- 1 factored.
+
+A corpus file holds `count` semiprimes N = p*q with p, q random primes of
+`bits` bits, generated from (bits, seed) alone, followed by the
+factorisations of p - 1, p + 1, q - 1 and q + 1. Integers are fixed-width
+little-endian byte strings, so the records are a numpy structured array that
+is memory-mapped on load:
+
+    header   64 bytes: magic, version, bits, count, seed, width, slots
+    record   p, q                     width bytes each
+             factors[4][slots]        (prime: width bytes, exponent: 1 byte),
+                                      unused slots are (0, 0)
+
+Entries only depend on (bits, seed) and their position, so a file built for
+a larger count starts with the corpus of any smaller count.
+"""
+import os
+import random
+import struct
+
+import numpy as np
+
+from number_theory import factor_int, is_probable_prime
+from parallel_runner import cell_seed
+
+MAGIC = b"SEMIPRIM"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQII")
+HEADER_SIZE = 64
+ORDERS = ("p-1", "p+1", "q-1", "q+1")
+
+
+def record_dtype(width, slots):
+    factorization = np.dtype([("primes", np.uint8, (slots, width)), ("exps", np.uint8, (slots,))])
+    return np.dtype([("p", np.uint8, (width,)), ("q", np.uint8, (width,)),
+                     ("factors", factorization, (len(ORDERS),))])
+
+
+def _to_bytes(v, width):
+    return np.frombuffer(int(v).to_bytes(width, "little"), dtype=np.uint8)
+
+
+def _from_bytes(row):
+    return int.from_bytes(row.tobytes(), "little")
+
+
+def random_prime(bits, rng):
+    """
+    Random prime with exactly `bits` bits
+    """
+    while True:
+        p = rng.getrandbits(bits) | (1 << (bits - 1)) | 1
+        if is_probable_prime(p):
+            return p
+
+
+def generate_semiprimes(bits, count, seed):
+    """
+    The first count (N, p, q) of the corpus (bits, seed), p != q
+    """
+    rng = random.Random(cell_seed(seed, "corpus", bits))
+    semiprimes = []
+    while len(semiprimes) < count:
+        p = random_prime(bits, rng)
+        q = random_prime(bits, rng)
+        while p == q:
+            q = random_prime(bits, rng)
+        semiprimes.append((p * q, p, q))
+    return semiprimes
+
+
+def build_corpus(path, bits, count, seed):
+    """
+    Generate the corpus (bits, seed) with count entries and write it to path
+    """
+    semiprimes = generate_semiprimes(bits, count, seed)
+    factorizations = [[factor_int(p - 1), factor_int(p + 1), factor_int(q - 1), factor_int(q + 1)]
+                      for N, p, q in semiprimes]
+    width = -(-(bits + 1) // 64) * 8
+    slots = max([1] + [len(f) for entry in factorizations for f in entry])
+
+    records = np.zeros(count, dtype=record_dtype(width, slots))
+    for i, ((N, p, q), entry) in enumerate(zip(semiprimes, factorizations)):
+        records[i]["p"] = _to_bytes(p, width)
+        records[i]["q"] = _to_bytes(q, width)
+        for k, factors in enumerate(entry):
+            for s, (l, e) in enumerate(factors.items()):
+                records[i]["factors"][k]["primes"][s] = _to_bytes(l, width)
+                records[i]["factors"][k]["exps"][s] = e
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, bits, count, seed, width, slots).ljust(HEADER_SIZE, b"\0"))
+        records.tofile(f)
+    os.replace(tmp, path)
+
+
+def read_header(path):
+    """
+    (bits, count, seed, width, slots) of a corpus file
+    """
+    with open(path, "rb") as f:
+        magic, version, bits, count, seed, width, slots = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} semiprime corpus")
+    return bits, count, seed, width, slots
+
+
+class Corpus:
+    """
+    Memory-mapped view of (the first count entries of) a corpus file
+    """
+
+    def __init__(self, path, count=None):
+        self.bits, stored, self.seed, width, slots = read_header(path)
+        if count is None:
+            count = stored
+        if count > stored:
+            raise ValueError(f"{path} holds {stored} entries, {count} requested")
+        self.path = path
+        self.records = np.memmap(path, dtype=record_dtype(width, slots), mode="r",
+                                 offset=HEADER_SIZE, shape=(count,))
+
+    def __len__(self):
+        return len(self.records)
+
+    def semiprime(self, i):
+        """
+        (N, p, q) of entry i
+        """
+        p = _from_bytes(self.records[i]["p"])
+        q = _from_bytes(self.records[i]["q"])
+        return p * q, p, q
+
+    def semiprimes(self):
+        return [self.semiprime(i) for i in range(len(self))]
+
+    def factorization(self, i, order):
+        """
+        {prime: exponent} of p - 1, p + 1, q - 1 or q + 1 (order in ORDERS) of entry i
+        """
+        f = self.records[i]["factors"][ORDERS.index(order)]
+        return {_from_bytes(l): int(e) for l, e in zip(f["primes"], f["exps"]) if e}
+
+    def factorizations(self, i):
+        """
+        {n: {prime: exponent}} for n in p - 1, p + 1, q - 1, q + 1 of entry i
+        """
+        N, p, q = self.semiprime(i)
+        values = (p - 1, p + 1, q - 1, q + 1)
+        return {n: self.factorization(i, order) for n, order in zip(values, ORDERS)}
+
+
+def corpus_path(directory, bits, seed):
+    return os.path.join(directory, f"semiprimes_{bits}b_{seed}.bin")
+
+
+def load_corpus(bits, count, seed, directory="corpora"):
+    """
+    The first count entries of the corpus (bits, seed), building (or
+    enlarging) its file in directory when needed
+    """
+    bits, count, seed = int(bits), int(count), int(seed)
+    path = corpus_path(directory, bits, seed)
+    if not os.path.exists(path) or read_header(path)[1] < count:
+        build_corpus(path, bits, count, seed)
+    return Corpus(path, count)
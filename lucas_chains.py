@@ -0,0 +1,361 @@
+"""
+Lucas chains (differential addition chains) for the stage 1 primes,
+found with Montgomery's PRAC heuristic.
+
+An x-only engine only knows doubling and P + Q given P - Q, so a scalar
+multiple must be a Lucas chain. The ladder takes one doubling and one
+addition per bit. PRAC starts from r ~ n/phi and reduces (d, e) with the
+first applicable of nine rules; for the primes up to 10^5 its chains take
+about 1.46 group operations per bit instead of 2. For every prime several
+starting ratios r/n (those of GMP-ECM, and r +- 1 around each) are tried.
+The cheapest chain is kept, weighting an addition 6 and a doubling 5
+modular multiplications as on a Montgomery curve.
+
+A chain is stored as its rule sequence ("0" for the swap of d and e), one
+CSV row per prime. When loaded, the rules are compiled to a tape of register
+operations in which the swaps and permutations have been resolved:
+
+    (dst, a, -1, -1)   R[dst] = 2*R[a]
+    (dst, a, b, c)     R[dst] = R[a] + R[b], where R[c] = R[a] - R[b]
+
+All registers start at P, and n*P ends up in the tape's output register.
+Every chain is checked on integers when compiled, and again when loaded
+from the CSV file, so a stale or edited file cannot yield a wrong chain. Engines run a chain as a
+straight-line Python function generated from the tape with their own
+doubling and addition expressions (see compile_function), so there is no
+per-operation interpreter overhead.
+"""
+import csv
+import math
+import os
+from functools import lru_cache
+
+from number_theory import is_probable_prime
+from schedule import primes_up_to
+
+# Next to this module, not in the working directory of whoever loads it
+CHAINS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chains", "prac.csv")
+
+# Starting ratios r/n (GMP-ECM's), golden ratio first
+RATIOS = (0.61803398874989485, 0.72360679774997897, 0.58017872829546410,
+          0.63283980608870629, 0.61242994950949500, 0.62018198080741576,
+          0.61721461653440386, 0.61908144640177866, 0.62023751066125195,
+          0.61879562355231122)
+ADD_COST, DBL_COST = 6, 5
+
+# (additions, doublings) of each rule; rule "0" swaps d and e
+RULE_OPS = {"0": (0, 0), "1": (3, 0), "2": (1, 1), "3": (1, 0), "4": (1, 1),
+            "5": (1, 1), "6": (3, 1), "7": (3, 1), "8": (3, 1), "9": (1, 1)}
+
+
+def prac_rules(n, r):
+    """
+    (rules, cost) of the PRAC chain for odd n starting from r, or None if r
+    does not lead to a chain for n
+    """
+    if not n // 2 < r < n or math.gcd(n, r) != 1:
+        return None
+    d, e = n - r, 2*r - n
+    rules = []
+    cost = DBL_COST + ADD_COST  # the first doubling and the final addition
+    for _ in range(4 * n.bit_length() + 64):
+        if d == e:
+            return "".join(rules), cost
+        if d < e:
+            d, e = e, d
+            rules.append("0")
+        if d - e <= e // 4 and (d + e) % 3 == 0:
+            d = (2*d - e) // 3
+            e = (e - d) // 2
+            rule = "1"
+        elif d - e <= e // 4 and (d - e) % 6 == 0:
+            d = (d - e) // 2
+            rule = "2"
+        elif (d + 3) // 4 <= e:
+            d -= e
+            rule = "3"
+        elif (d + e) % 2 == 0:
+            d = (d - e) // 2
+            rule = "4"
+        elif d % 2 == 0:  # d + e is odd from here on
+            d //= 2
+            rule = "5"
+        elif d % 3 == 0:  # d is odd and e even from here on
+            d = d // 3 - e
+            rule = "6"
+        elif (d + e) % 3 == 0:
+            d = (d - 2*e) // 3
+            rule = "7"
+        elif (d - e) % 3 == 0:
+            d = (d - e) // 3
+            rule = "8"
+        else:
+            e //= 2
+            rule = "9"
+        rules.append(rule)
+        adds, dbls = RULE_OPS[rule]
+        cost += ADD_COST*adds + DBL_COST*dbls
+    return None
+
+
+def compile_tape(n, rules):
+    """
+    (tape, out): the register operations of the chain rules for n
+    """
+    if n == 2:
+        return ((0, 0, -1, -1),), 0
+    reg = {"A": 0, "B": 1, "C": 2, "T": 3, "T2": 4}
+    tape = []
+
+    def dbl(dst, a):
+        tape.append((reg[dst], reg[a], -1, -1))
+
+    def add(dst, a, b, c):
+        tape.append((reg[dst], reg[a], reg[b], reg[c]))
+
+    dbl("A", "A")
+    for rule in rules:
+        if rule == "0":
+            reg["A"], reg["B"] = reg["B"], reg["A"]
+        elif rule == "1":
+            add("T", "A", "B", "C")
+            add("T2", "T", "A", "B")
+            add("B", "B", "T", "A")
+            reg["A"], reg["T2"] = reg["T2"], reg["A"]
+        elif rule == "2":
+            add("B", "A", "B", "C")
+            dbl("A", "A")
+        elif rule == "3":
+            add("T", "B", "A", "C")
+            reg["B"], reg["T"], reg["C"] = reg["T"], reg["C"], reg["B"]
+        elif rule == "4":
+            add("B", "B", "A", "C")
+            dbl("A", "A")
+        elif rule == "5":
+            add("C", "C", "A", "B")
+            dbl("A", "A")
+        elif rule == "6":
+            dbl("T", "A")
+            add("T2", "A", "B", "C")
+            add("A", "T", "A", "A")
+            add("T", "T", "T2", "C")
+            reg["C"], reg["B"], reg["T"] = reg["B"], reg["T"], reg["C"]
+        elif rule in "78":
+            add("T", "A", "B", "C")
+            if rule == "7":
+                add("B", "T", "A", "B")
+            else:
+                add("C", "C", "A", "B")
+                reg["B"], reg["T"] = reg["T"], reg["B"]
+            dbl("T", "A")
+            add("A", "A", "T", "A")
+        else:
+            add("C", "C", "B", "A")
+            dbl("B", "B")
+    add("A", "A", "B", "C")
+    return tuple(tape), reg["A"]
+
+
+def check_tape(n, tape, out):
+    """
+    Run the tape on integers: True if every addition has its difference at
+    hand and the output is n
+    """
+    R = [1] * 5
+    for dst, a, b, c in tape:
+        if b < 0:
+            R[dst] = 2 * R[a]
+        elif abs(R[a] - R[b]) != R[c]:
+            return False
+        else:
+            R[dst] = R[a] + R[b]
+    return R[out] == n
+
+
+def compile_chain(l):
+    """
+    Rules of the cheapest checked PRAC chain for the prime l
+    """
+    if l <= 3:
+        return ""
+    best = None
+    for v in RATIOS:
+        r0 = int(l * v + 0.5)
+        for r in (r0, r0 - 1, r0 + 1):
+            found = prac_rules(l, r)
+            if found is None or (best is not None and found[1] >= best[1]):
+                continue
+            if check_tape(l, *compile_tape(l, found[0])):
+                best = found
+    if best is None:
+        raise ArithmeticError(f"No PRAC chain found for {l}")
+    return best[0]
+
+
+def compile_function(tape, out, double, add, params, namespace=None):
+    """
+    f(P, *params) computing n*P with the tape in straight-line code.
+    double and add are expression templates in the registers {a}, {b}, {c}
+    and the names of params (and namespace), e.g. "(2*{a}*{b} - {c}) % N".
+    """
+    lines = [f"def chain(P, {params}):", "    r0 = r1 = r2 = r3 = r4 = P"]
+    for dst, a, b, c in tape:
+        if b < 0:
+            expr = double.format(a=f"r{a}")
+        else:
+            expr = add.format(a=f"r{a}", b=f"r{b}", c=f"r{c}")
+        lines.append(f"    r{dst} = {expr}")
+    lines.append(f"    return r{out}")
+    scope = dict(namespace or {})
+    exec("\n".join(lines), scope)
+    return scope["chain"]
+
+
+@lru_cache(maxsize=None)
+def _tape(l, rules):
+    return compile_tape(l, rules)
+
+
+@lru_cache(maxsize=1 << 16)
+def _prime_power(n):
+    """
+    (l, e) with n = l^e and e as large as possible
+    """
+    log_n = math.log(n)
+    for e in range(n.bit_length(), 1, -1):
+        l = round(math.exp(log_n / e))
+        for root in (l, l - 1, l + 1):
+            if root > 1 and root**e == n:
+                return root, e
+    return n, 1
+
+
+class ChainTable:
+    """
+    {prime: rules} loaded from (and saved to) a CSV file. Chains of primes
+    not in the table are compiled when first asked for.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.chains = {}
+        self.bound = 0  # every prime <= bound is in the table
+        self.functions = {}
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        """
+        Read the table, keeping only rows of primes whose chain checks out
+        (others are compiled again) and lowering the bound to the primes
+        actually covered. The file is rewritten if anything was repaired.
+        """
+        repaired = False
+        with open(self.path, newline="") as csvfile:
+            reader = csv.reader(csvfile)
+            try:
+                bound = int(next(reader)[1])
+            except (StopIteration, IndexError, ValueError):
+                bound, repaired = 0, True
+            for row in reader:
+                try:
+                    l, rules = int(row[0]), row[1]
+                except (IndexError, ValueError):
+                    repaired = True
+                    continue
+                if l < 2 or not is_probable_prime(l):
+                    repaired = True
+                    continue
+                if set(rules) - set(RULE_OPS) or not check_tape(l, *compile_tape(l, rules)):
+                    rules, repaired = compile_chain(l), True
+                self.chains[l] = rules
+        for l in primes_up_to(bound):
+            if l not in self.chains:
+                bound, repaired = l - 1, True
+                break
+        self.bound = bound
+        if repaired:
+            self.save()
+
+    def chain(self, l):
+        if l not in self.chains:
+            self.chains[l] = compile_chain(l)
+        return self.chains[l]
+
+    def extend(self, B):
+        """
+        Compile the chains of all primes <= B, saving the table if it grew
+        """
+        B = int(B)
+        if B <= self.bound:
+            return
+        for l in primes_up_to(B):
+            self.chain(l)
+        self.bound = B
+        if self.path is not None:
+            self.save()
+
+    def save(self):
+        """
+        Write the table to a temporary file renamed over path, so parallel
+        workers saving at once never leave a partial file. Returns False
+        (the table is then kept in memory only) if path is not writable.
+        """
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp, "w", newline="") as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(["Bound", self.bound])
+                for l in sorted(self.chains):
+                    writer.writerow([l, self.chains[l]])
+            os.replace(tmp, self.path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+        return True
+
+    def tape(self, n):
+        """
+        (tape, out, e) for n = l^e: the tape for l is run e times
+        """
+        l, e = _prime_power(int(n))
+        tape, out = _tape(l, self.chain(l))
+        return tape, out, e
+
+    def function(self, n, double, add, params, namespace=None):
+        """
+        (f, e) for n = l^e, with f the compile_function of l's chain (cached
+        per prime and templates); n*P is f applied e times
+        """
+        l, e = _prime_power(int(n))
+        key = (l, double, add)
+        if key not in self.functions:
+            tape, out = _tape(l, self.chain(l))
+            self.functions[key] = compile_function(tape, out, double, add, params, namespace)
+        return self.functions[key], e
+
+    def counts(self, n):
+        """
+        (doublings, additions) of n*P for a prime power n
+        """
+        tape, _, e = self.tape(n)
+        dbl = sum(1 for op in tape if op[2] < 0)
+        return e * dbl, e * (len(tape) - dbl)
+
+
+_TABLES = {}
+
+
+def load_chains(B=0, path=CHAINS_PATH):
+    """
+    Shared chain table of path, covering at least the primes <= B
+    """
+    table = _TABLES.get(path)
+    if table is None:
+        table = _TABLES[path] = ChainTable(path)
+    table.extend(B)
+    return table
@@ -0,0 +1,160 @@
+"""
+Inversion-free ECM arithmetic on Montgomery curves B*y^2 = x^3 + A*x^2 + x
+over Z/NZ.
+
+Points are kept in projective X:Z form and only X and Z are tracked, so a
+scalar multiple costs one xDBL and one xADD per bit of the Montgomery
+ladder and no modular inversion. A factor shows up as gcd(Z, N).
+"""
+from functools import lru_cache
+from math import gcd
+
+from conic_kernel import mpz
+from stage1 import DEFAULT_BATCH
+from stage2 import _giant_step
+
+
+def suyama_curve(sigma, N):
+    """
+    Suyama's parametrisation for sigma >= 6.
+    Returns (g, P, a24) with P = (X0, Z0) and a24 = (A + 2)/4 mod N.
+    The one inversion of the setup is done here; if it fails, g is
+    gcd(denominator, N) and P, a24 are None.
+    """
+    N = mpz(int(N))
+    sigma = mpz(int(sigma))
+    u = (sigma*sigma - 5) % N
+    v = 4*sigma % N
+    X0 = u*u*u % N
+    Z0 = v*v*v % N
+
+    # (A + 2)/4 = (v - u)^3 (3u + v) / (16 u^3 v)
+    num = (v - u)**3 * (3*u + v) % N
+    den = 16 * X0 * v % N
+    g = gcd(int(den), int(N))
+    if g != 1:
+        return g, None, None
+    a24 = num * pow(int(den), -1, int(N)) % N
+    return None, (X0, Z0), a24
+
+
+def x_double(P, a24, N):
+    """
+    xDBL: X:Z of 2P
+    """
+    X, Z = P
+    s = (X + Z) * (X + Z) % N
+    d = (X - Z) * (X - Z) % N
+    t = s - d
+    return s*d % N, t*(d + a24*t) % N
+
+
+def x_add(P, Q, diff, N):
+    """
+    xADD: X:Z of P + Q given diff = P - Q
+    """
+    XP, ZP = P
+    XQ, ZQ = Q
+    u = (XP - ZP) * (XQ + ZQ)
+    v = (XP + ZP) * (XQ - ZQ)
+    return diff[1] * (u + v)**2 % N, diff[0] * (u - v)**2 % N
+
+
+def ladder(n, P, a24, N):
+    """
+    Montgomery ladder for n*P, carrying (kP, (k+1)P) through the bits of n
+    """
+    n = int(n)
+    if n == 0:
+        return mpz(1), mpz(0)  # point at infinity, X:Z = 1:0
+
+    R0, R1 = P, x_double(P, a24, N)
+    for i in range(n.bit_length() - 2, -1, -1):
+        if (n >> i) & 1:
+            R0, R1 = x_add(R1, R0, P, N), x_double(R1, a24, N)
+        else:
+            R0, R1 = x_double(R0, a24, N), x_add(R1, R0, P, N)
+    return R0
+
+
+def ladder_chain(n, P, a24, N, chains):
+    """
+    n*P for a prime power n = l^e, running the Lucas chain of l from chains
+    (a lucas_chains.ChainTable) e times instead of the ladder
+    """
+    chain, e = chains.function(n, "x_double({a}, a24, N)", "x_add({a}, {b}, {c}, N)",
+                               "a24, N", {"x_double": x_double, "x_add": x_add})
+    for _ in range(e):
+        P = chain(P, a24, N)
+    return P
+
+
+@lru_cache(maxsize=16)
+def _stage2_layout(primes):
+    """
+    (D, {k: (j, ...)}) with every q in primes written as k*D +- j
+    """
+    primes = sorted(primes)
+    D = _giant_step(primes[0], primes[-1])
+    steps = {}
+    for q in primes:
+        k = (q + D // 2) // D
+        steps.setdefault(k, []).append(abs(q - k*D))
+    return D, {k: tuple(js) for k, js in steps.items()}
+
+
+def ecm_stage2(N, P, a24, primes, batch=DEFAULT_BATCH):
+    """
+    Baby-step/giant-step stage 2 from the stage 1 point P over the primes q
+    in `primes`, laid out as stage2.run_stage2: for q = k*D +- j the points
+    kD*P and j*P have the same x-coordinate modulo p when q*P = O mod p,
+    so X_kD - x_j*Z_kD is accumulated, with the baby steps normalised to
+    x_j = X_j/Z_j. Giant steps are walked with
+    xADD((k+1)D P) = xADD(kD P, D P, (k-1)D P).
+    The layout of the primes is cached, so pass the same tuple to every
+    curve.
+    Returns g: a nontrivial factor, N (both factors caught in the same
+    block of `batch` giant steps, or by the same q) or 1.
+    """
+    N = int(N)
+    if not primes:
+        return 1
+    n = mpz(N)
+    D, steps = _stage2_layout(tuple(primes))
+
+    # Baby steps j*P for odd j <= D/2, (j+2)P = xADD(jP, 2P, (j-2)P)
+    P2 = x_double(P, a24, n)
+    points = {1: P}
+    prev, cur = P, P  # -P and P share X:Z
+    for j in range(3, D // 2 + 1, 2):
+        prev, cur = cur, x_add(cur, P2, prev, n)
+        points[j] = cur
+    baby = {}
+    for j, (X, Z) in points.items():
+        g = gcd(int(Z), N)
+        if g != 1:
+            return g
+        baby[j] = X * pow(int(Z), -1, N) % n
+
+    k_first, k_last = min(steps), max(steps)
+    GD = ladder(D, P, a24, n)
+    G_cur = ladder(k_first * D, P, a24, n)
+    G_next = ladder((k_first + 1) * D, P, a24, n)
+
+    acc = 1
+    k_block = k_first
+    for k in range(k_first, k_last + 1):
+        X, Z = G_cur
+        for j in steps.get(k, ()):
+            acc = acc * (X - baby[j]*Z) % n
+
+        if k - k_block + 1 == batch or k == k_last:
+            g = gcd(int(acc), N)
+            if g != 1:
+                return g
+            acc = 1
+            k_block = k + 1
+
+        G_cur, G_next = G_next, x_add(G_next, GD, G_cur, n)
+
+    return 1
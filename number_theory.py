@@ -0,0 +1,144 @@
+"""
+Small pure-Python number theory helpers: Jacobi symbol, Miller-Rabin,
+Pollard rho and complete factorisation of moderately sized integers.
+
+These are meant for analysing p +- 1 and q +- 1 of the experiment
+semiprimes, i.e. numbers of up to about 100 bits, outside of Sage.
+"""
+import random
+from math import gcd, prod
+
+from schedule import primes_up_to
+
+_SMALL_PRIMES = primes_up_to(1000)
+# Deterministic Miller-Rabin bases for n < MR_DETERMINISTIC
+_MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+MR_DETERMINISTIC = 3317044064679887385961981
+
+
+def jacobi(a, n):
+    """
+    Jacobi symbol (a/n) for odd n > 0
+    """
+    a, n = int(a) % int(n), int(n)
+    if n <= 0 or n % 2 == 0:
+        raise ValueError("n must be odd and positive")
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def is_probable_prime(n):
+    """
+    Miller-Rabin, deterministic below 3.3 * 10^24 and with 13 fixed bases above
+    """
+    n = int(n)
+    if n < 2:
+        return False
+    for p in _SMALL_PRIMES[:13]:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in _MR_BASES:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def pollard_rho(n, rng=None, limit=None):
+    """
+    A nontrivial factor of the composite n (Brent's variant of Pollard rho),
+    or None if none was found within about limit iterations (no limit by
+    default).
+    The default generator is seeded by n, so the experiments' global random
+    state is left alone and the result is reproducible.
+    """
+    n = int(n)
+    if n % 2 == 0:
+        return 2
+    if rng is None:
+        rng = random.Random(n)
+    iterations = 0
+    while True:
+        y, c, m = rng.randrange(1, n), rng.randrange(1, n), 128
+        g = r = q = 1
+        while g == 1:
+            if limit is not None and iterations > limit:
+                return None
+            x = y
+            for _ in range(r):
+                y = (y*y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = (y*y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            iterations += 2 * r
+            r *= 2
+        if g == n:
+            g = 1
+            while g == 1:
+                ys = (ys*ys + c) % n
+                g = gcd(abs(x - ys), n)
+        if g != n:
+            return g
+
+
+def factor_int(n):
+    """
+    {prime: exponent} of n >= 1
+    """
+    n = int(n)
+    factors = {}
+    for p in _SMALL_PRIMES:
+        if p * p > n:
+            break
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+    stack = [n] if n > 1 else []
+    while stack:
+        m = stack.pop()
+        if is_probable_prime(m):
+            factors[m] = factors.get(m, 0) + 1
+        else:
+            g = pollard_rho(m)
+            stack += [g, m // g]
+    return dict(sorted(factors.items()))
+
+
+def element_order(is_identity, order_factors):
+    """
+    Exact order of a group element given is_identity(n), true iff the
+    element raised to n is the identity, and {prime: exponent} of a multiple
+    of its order (e.g. the group order). Prime factors are stripped from the
+    multiple for as long as the element stays killed.
+    """
+    n = prod(l**e for l, e in order_factors.items())
+    for l, e in order_factors.items():
+        for _ in range(e):
+            if not is_identity(n // l):
+                break
+            n //= l
+    return n
@@ -0,0 +1,208 @@
+"""
+Constant-memory aggregates of a stream of experiment results.
+
+Finished cells are folded into running statistics as they arrive instead of
+being collected into lists for np.mean/np.median at the end:
+- RunningStats: count, mean, variance (Welford), min and max
+- P2Quantile: a quantile estimate from five markers (Jain and Chlamtac's
+  P^2 algorithm), exact for the first five observations
+- OnlineSummary: per group (a method, or (method, B)) cell and success
+  counts, trials to success, time and group operations per cell
+Summaries can be printed at any point of a run, and they cost the same
+memory after 10 cells as after 10^7.
+"""
+import math
+
+
+class RunningStats:
+    """
+    Running count, mean, variance, min and max
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.min = None
+        self.max = None
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+
+    def merge(self, other):
+        """
+        Fold in the statistics of another stream (Chan et al.)
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    def variance(self):
+        """
+        Sample variance (0 for fewer than two observations)
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def std(self):
+        return math.sqrt(self.variance())
+
+
+class P2Quantile:
+    """
+    Streaming estimate of the p-quantile from five markers
+    """
+
+    def __init__(self, p):
+        if not 0 < p < 1:
+            raise ValueError("p must be in (0, 1)")
+        self.p = p
+        self.heights = []  # marker heights, the first five observations at first
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2*p, 4*p, 2 + 2*p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def __len__(self):
+        return self.positions[4] + 1 if len(self.heights) == 5 else len(self.heights)
+
+    def update(self, x):
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0], k = x, 0
+        elif x >= q[4]:
+            q[4], k = x, 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                h = self._parabolic(i, d)
+                if not q[i - 1] < h < q[i + 1]:
+                    h = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = h
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self):
+        """
+        Current estimate (None before the first observation)
+        """
+        q = self.heights
+        if not q:
+            return None
+        if len(self) <= 5:
+            return q[min(len(q) - 1, int(self.p * len(q)))]
+        return q[2]
+
+
+class GroupStats:
+    """
+    Aggregates of the cells of one group
+    """
+    QUANTILES = (0.5, 0.9)
+
+    def __init__(self):
+        self.cells = 0
+        self.successes = 0
+        self.trials = RunningStats()
+        self.trial_quantiles = {p: P2Quantile(p) for p in self.QUANTILES}
+        self.elapsed = RunningStats()
+        self.elapsed_quantiles = {p: P2Quantile(p) for p in self.QUANTILES}
+        self.additions = RunningStats()
+
+    def update(self, trial, elapsed=None, additions=None):
+        """
+        One finished cell: trial of the success (None for a failure), and
+        its time and group operations when known
+        """
+        self.cells += 1
+        if trial is not None:
+            self.successes += 1
+            self.trials.update(trial)
+            for sketch in self.trial_quantiles.values():
+                sketch.update(trial)
+        if elapsed is not None:
+            self.elapsed.update(elapsed)
+            for sketch in self.elapsed_quantiles.values():
+                sketch.update(elapsed)
+        if additions is not None:
+            self.additions.update(additions)
+
+    def lines(self):
+        lines = [f"  Successes: {self.successes}/{self.cells}"]
+        if self.trials.count:
+            t = self.trials
+            q = self.trial_quantiles
+            lines.append(f"  Trials to success: mean {t.mean:.2f}, sd {t.std():.2f}, "
+                         f"median {q[0.5].value():.1f}, p90 {q[0.9].value():.1f}, max {t.max}")
+        if self.elapsed.count:
+            t = self.elapsed
+            q = self.elapsed_quantiles
+            lines.append(f"  Time per cell: mean {t.mean:.4f}s, sd {t.std():.4f}s, "
+                         f"median {q[0.5].value():.4f}s, p90 {q[0.9].value():.4f}s")
+        if self.additions.count:
+            t = self.additions
+            lines.append(f"  Group operations per cell: mean {t.mean:.1f}, sd {t.std():.1f}")
+        return lines
+
+
+class OnlineSummary:
+    """
+    {group key: GroupStats}, filled one finished cell at a time
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    def update(self, key, trial, elapsed=None, additions=None):
+        if key not in self.groups:
+            self.groups[key] = GroupStats()
+        self.groups[key].update(trial, elapsed, additions)
+
+    def __getitem__(self, key):
+        return self.groups.get(key) or GroupStats()
+
+    def report(self, keys=None, title=None, label=str):
+        """
+        Print the groups in keys (all groups by default), headed by
+        label(key), under an optional title
+        """
+        if title is not None:
+            print("=" * 70)
+            print(title)
+        for key in (self.groups if keys is None else keys):
+            print(f"\n{label(key)}")
+            for line in self[key].lines():
+                print(line)
+        print(flush=True)
@@ -0,0 +1,143 @@
+"""
+Opt-in operation counts for the group factoring methods.
+
+An OpCounter is passed down a trial only when counting was asked for, so a
+trial run without one does no counting at all. Kernels are not instrumented
+operation by operation. Each ladder call is charged from its scalar alone,
+with the fixed cost per bit of its formulas:
+
+    conic_mul     double: 2 sqr + 2 mul         add P: 5 mul
+    conic_mul_wnaf  as conic_mul, one add per nonzero wNAF digit plus the
+                  precomputed odd multiples
+    lucas_x_mul   per bit: 1 sqr + 1 mul        (x_{2m} and x_{2m+1})
+    lucas_x_chain doubling: 1 sqr               addition: 1 mul
+    power_mod     square: 1 sqr                 multiply: 1 mul
+    ladder        xDBL: 2 sqr + 3 mul           xADD: 2 sqr + 4 mul
+    ladder_chain  as ladder, per operation of the PRAC chain
+    affine_mul    double: 2 sqr + 2 mul + inv   add: 1 sqr + 2 mul + inv
+
+mul/sqr/inv/gcd are modular operations on residues mod N, dbl/add the group
+doublings and additions behind them. Counts are kept per stage ("setup",
+"stage1", "stage2"). Chains are read from the shared lucas_chains table.
+"""
+from conic_kernel import wnaf, wnaf_width
+from lucas_chains import load_chains
+
+OPS = ("mul", "sqr", "dbl", "add", "inv", "gcd")
+
+
+class OpCounter:
+    """
+    Operation counts of one or more trials, per stage
+    """
+
+    def __init__(self):
+        self.stage = "setup"
+        self.stages = {}
+
+    def count(self, **ops):
+        counts = self.stages.setdefault(self.stage, dict.fromkeys(OPS, 0))
+        for op, k in ops.items():
+            counts[op] += k
+
+    def totals(self):
+        """
+        {op: count} summed over the stages
+        """
+        return {op: sum(counts[op] for counts in self.stages.values()) for op in OPS}
+
+    def __getitem__(self, op):
+        return self.totals()[op]
+
+    def additions(self):
+        """
+        Group operations (doublings and additions), the archived total_additions
+        """
+        totals = self.totals()
+        return totals["dbl"] + totals["add"]
+
+    def __iadd__(self, other):
+        for stage, counts in other.stages.items():
+            mine = self.stages.setdefault(stage, dict.fromkeys(OPS, 0))
+            for op in OPS:
+                mine[op] += counts[op]
+        return self
+
+    def __repr__(self):
+        parts = []
+        for stage, counts in self.stages.items():
+            inner = ", ".join(f"{op}={counts[op]}" for op in OPS if counts[op])
+            parts.append(f"{stage}: {inner}")
+        return f"OpCounter({'; '.join(parts)})"
+
+    # Cost of one ladder call, from the scalar n alone
+
+    def conic_mul(self, n):
+        n = int(n)
+        if n <= 1:
+            return
+        dbl, add = n.bit_length() - 1, bin(n).count("1") - 1
+        self.count(dbl=dbl, add=add, sqr=2*dbl, mul=2*dbl + 5*add)
+
+    def conic_mul_wnaf(self, n):
+        n = int(n)
+        if n == 0:
+            return
+        w = wnaf_width(n)
+        digits = wnaf(n, w)
+        # 2P and the odd multiples up to (2^(w-1) - 1)P, then the digits
+        dbl = len(digits)
+        add = (1 << (w - 2)) - 1 + sum(1 for digit in digits if digit) - 1
+        self.count(dbl=dbl, add=add, sqr=2*dbl, mul=2*dbl + 5*add)
+
+    def lucas_x_mul(self, n):
+        n = int(n)
+        if n == 0:
+            return
+        bits = n.bit_length() - 1
+        self.count(dbl=bits + 1, add=bits, sqr=bits + 1, mul=bits)
+
+    def lucas_x_chain(self, n):
+        n = int(n)
+        if n <= 1:
+            return
+        dbl, add = load_chains().counts(n)
+        self.count(dbl=dbl, add=add, sqr=dbl, mul=add)
+
+    def power_mod(self, n):
+        n = int(n)
+        if n <= 1:
+            return
+        dbl, add = n.bit_length() - 1, bin(n).count("1") - 1
+        self.count(dbl=dbl, add=add, sqr=dbl, mul=add)
+
+    def ladder(self, n):
+        n = int(n)
+        if n == 0:
+            return
+        bits = n.bit_length() - 1
+        self.count(dbl=bits + 1, add=bits, sqr=2*(bits + 1) + 2*bits, mul=3*(bits + 1) + 4*bits)
+
+    def ladder_chain(self, n):
+        n = int(n)
+        if n <= 1:
+            return
+        dbl, add = load_chains().counts(n)
+        self.count(dbl=dbl, add=add, sqr=2*dbl + 2*add, mul=3*dbl + 4*add)
+
+    def affine_mul(self, n):
+        n = int(n)
+        if n <= 1:
+            return
+        dbl, add = n.bit_length() - 1, bin(n).count("1") - 1
+        self.count(dbl=dbl, add=add, sqr=2*dbl + add, mul=2*dbl + 2*add, inv=dbl + add)
+
+
+def counted(step, counter, cost):
+    """
+    step(state, E) that first charges cost(counter, E) to counter
+    """
+    def counted_step(state, E):
+        cost(counter, E)
+        return step(state, E)
+    return counted_step
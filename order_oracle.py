@@ -0,0 +1,151 @@
+"""
+Order oracle: the outcome of a trial predicted from the known factors p, q.
+
+A trial of the Pollard, Pell or Williams method succeeds when the order of
+its starting element modulo one factor divides the stage 1 exponent and the
+order modulo the other factor does not. With p and q known, p +- 1 and
+q +- 1 are factored once per N. The exact order of a starting element is
+then found by stripping primes from the group order:
+
+    Pollard   a in (Z/p)^*               group order p - 1
+    Pell      (x, y) on x^2 - d*y^2 = 1  group order p - (d/p)
+    Williams  (u, v) on the same conic   group order p - (d/p)
+
+An order o = prod l^k is caught by stage 1 at its largest prime l if every
+l^k divides the schedule's l^e, and by stage 2 at r if o = s*r with s caught
+by stage 1 and r a prime in (B, B2]. Blocks whose gcd is N are replayed
+prime by prime, so the trial finds the factor caught first; both caught at
+the same prime gives N, a failed trial. Stage 2 pairs q = kD +- j can on
+rare occasions catch an order a little early, which the oracle ignores.
+"""
+from functools import lru_cache
+
+from conic_kernel import conic_mul
+from number_theory import element_order, factor_int, jacobi
+from schedule import stage1_schedule
+
+
+@lru_cache(maxsize=4096)
+def _factor(n):
+    return factor_int(n)
+
+
+@lru_cache(maxsize=64)
+def _prime_index(schedule):
+    """
+    {l: (position in the schedule, e)} for a (cached, shared) Schedule
+    """
+    return {l: (i, e) for i, (l, e, _) in enumerate(schedule.triples)}
+
+
+def _order_factors(order, group_factors):
+    factors = {}
+    for l in group_factors:
+        while order % l == 0:
+            factors[l] = factors.get(l, 0) + 1
+            order //= l
+    return factors
+
+
+def unit_order(a, p, group):
+    """
+    Order of a in (Z/p)^*, group = {prime: exponent} of p - 1
+    """
+    a = int(a) % p
+    return element_order(lambda n: pow(a, n, p) == 1, group)
+
+
+def conic_order(P, d, p, group):
+    """
+    Order of the point P on x^2 - d*y^2 = 1 over F_p, group = {prime: exponent}
+    of the group order p - (d/p)
+    """
+    x, y, d = int(P[0]) % p, int(P[1]) % p, int(d) % p
+    return element_order(lambda n: conic_mul(n, (x, y), d, p) == (1, 0), group)
+
+
+class OrderOracle:
+    """
+    Predicts trials on N = p*q. Orders and factorisations are cached, so
+    after the first trial on an N a prediction costs a few modular powerings.
+    """
+
+    def __init__(self, N, p, q, factorizations=None):
+        """
+        factorizations: optional {n: {prime: exponent}} for p +- 1, q +- 1
+        that are already known (e.g. from a corpus.Corpus), skipping factor_int
+        """
+        self.N, self.p, self.q = int(N), int(p), int(q)
+        if self.p * self.q != self.N:
+            raise ValueError("N must be p*q")
+        self.factorizations = dict(factorizations or {})
+
+    def _factor(self, n):
+        if n not in self.factorizations:
+            self.factorizations[n] = _factor(n)
+        return self.factorizations[n]
+
+    def _catch(self, order, group_factors, B, policy, B2):
+        """
+        (stage, key, l): when a factor of order `order` is caught, ordered by
+        (stage, key), and the prime l at which it is caught. None if never.
+        """
+        schedule = stage1_schedule(self.N, B, policy)
+        index = _prime_index(schedule)
+        factors = _order_factors(order, group_factors)
+
+        def stage1(factors):
+            last = 0  # order 1: the first prime already sees the identity
+            for l, k in factors.items():
+                if l not in index or index[l][1] < k:
+                    return None
+                last = max(last, index[l][0])
+            return last
+
+        i = stage1(factors)
+        if i is not None:
+            return 1, i, schedule.primes[i]
+        if B2 is None or B2 <= B:
+            return None
+        r = max(factors)
+        if factors[r] == 1 and B < r <= B2:
+            rest = dict(factors)
+            del rest[r]
+            if stage1(rest) is not None:
+                return 2, r, r
+        return None
+
+    def predict(self, order_p, group_p, order_q, group_q, B, policy="N", B2=None):
+        """
+        (g, l): the trial's result g (p, q, N for both factors at once, or 1)
+        and the prime l at which it is found (None if g == 1)
+        """
+        hit_p = self._catch(order_p, group_p, B, policy, B2)
+        hit_q = self._catch(order_q, group_q, B, policy, B2)
+        if hit_p is None and hit_q is None:
+            return 1, None
+        if hit_q is None or (hit_p is not None and hit_p[:2] < hit_q[:2]):
+            return self.p, hit_p[2]
+        if hit_p is None or hit_q[:2] < hit_p[:2]:
+            return self.q, hit_q[2]
+        return self.N, hit_p[2]
+
+    def unit(self, a, B, policy="N", B2=None):
+        """
+        Pollard trial with base a
+        """
+        group_p, group_q = self._factor(self.p - 1), self._factor(self.q - 1)
+        return self.predict(unit_order(a, self.p, group_p), group_p,
+                            unit_order(a, self.q, group_q), group_q, B, policy, B2)
+
+    def conic(self, P, d, B, policy="N", B2=None):
+        """
+        Pell or Williams trial starting from the point P of x^2 - d*y^2 = 1
+        """
+        groups = []
+        for p in (self.p, self.q):
+            s = jacobi(int(d) % p, p)
+            # d = 0 mod p leaves the degenerate conic x^2 = 1, a group of order 2p
+            groups.append({2: 1, p: 1} if s == 0 else self._factor(p - s))
+        return self.predict(conic_order(P, d, self.p, groups[0]), groups[0],
+                            conic_order(P, d, self.q, groups[1]), groups[1], B, policy, B2)
@@ -0,0 +1,62 @@
+"""
+Process-pool runner for experiment cells.
+
+A cell is one independent unit of an experiment, e.g. (method, N, B).
+Every cell carries its own seed, derived from the experiment seed and the
+cell's key, so the result of a cell does not depend on which worker runs it
+or in which order. Results always come back in cell order. Cells may be a
+generator: at most WINDOW cells per worker are handed to the pool ahead of
+the results consumed, so a long run holds only the cells in flight.
+"""
+import hashlib
+import multiprocessing
+import threading
+
+WINDOW = 256  # cells per worker in flight at most
+
+
+def cell_seed(base_seed, *key):
+    """
+    Deterministic 64-bit seed for the cell identified by key
+    """
+    digest = hashlib.sha256(repr((base_seed,) + key).encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def run_cells(worker, cells, workers=1, chunksize=1):
+    """
+    Yield worker(cell) for every cell, in order.
+    workers > 1 spreads the cells over a pool of forked processes; worker
+    must then be a module-level function so it can be sent to the pool.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    if workers <= 1:
+        for cell in cells:
+            yield worker(cell)
+        return
+
+    # imap draws the cells from its own thread; every cell takes a slot that
+    # is given back when its result is consumed, so the pool never waits on
+    # the slowest cell of a batch
+    slots = threading.Semaphore(WINDOW * workers)
+    stopped = False
+
+    def feed():
+        for cell in cells:
+            slots.acquire()
+            if stopped:
+                return
+            yield cell
+
+    # fork keeps the Sage session and the loaded methods in every worker
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(workers) as pool:
+        try:
+            for result in pool.imap(worker, feed(), chunksize):
+                slots.release()
+                yield result
+        finally:
+            stopped = True
+            slots.release()  # wake the feeder if it waits for a slot
@@ -12,8 +12,8 @@ def pollard_factor(N, B):
     
     b = a
     for l in primes(1, B+1):
-        e = math.ceil(math.log(l, N))
-        b = b**(l**e) % N
+        e = math.ceil(math.log(N, l))  # smallest e with l^e >= N
+        b = pow(b, l**e, N)
         d = math.gcd(b-1, N)
         if d != 1:
             if d < N:
@@ -0,0 +1,71 @@
+"""
+Append-only JSONL store of finished experiment cells.
+
+Each line records one cell keyed by (N, method, B, seed) together with its
+outcome. Lines are flushed as soon as a cell completes, so an interrupted
+sweep can be restarted and only the missing cells are recomputed. A line
+cut short by a crash is ignored on reload.
+"""
+import json
+import os
+
+
+def cell_key(N, method, B, seed):
+    return (int(N), str(method), int(B), int(seed))
+
+
+class ResultsStore:
+    """
+    Persistent {(N, method, B, seed): record} backed by a JSONL file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._records = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # partial last line of an interrupted run
+                    key = cell_key(record["N"], record["method"], record["B"], record["seed"])
+                    self._records[key] = record
+        self._file = open(path, "a")
+        if self._file.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")  # close off the partial line
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key):
+        return cell_key(*key) in self._records
+
+    def get(self, N, method, B, seed):
+        """
+        Stored record for the cell, or None if it has not been run yet
+        """
+        return self._records.get(cell_key(N, method, B, seed))
+
+    def put(self, N, method, B, seed, **fields):
+        """
+        Record a finished cell and flush it to disk
+        """
+        key = cell_key(N, method, B, seed)
+        record = {"N": key[0], "method": key[1], "B": key[2], "seed": key[3]}
+        record.update(fields)
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self._records[key] = record
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
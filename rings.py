@@ -0,0 +1,318 @@
+"""
+Arithmetic contexts for Z/NZ with interchangeable backends.
+
+A ring context turns integers into its own residues (element), and residues
+back into reduced integers (value). It works on residues with add, sub,
+mul, sqr, inv, powmod and gcd. The backends are:
+
+    int         Python ints, reduced with %
+    gmpy2       gmpy2 mpz with gmpy2.powmod/invert/gcd (needs gmpy2)
+    montgomery  Montgomery-form residues a*R mod N, R = 2^bits(N), reduced
+                with REDC instead of division (odd N only)
+    sage        Integers(N) elements (needs Sage)
+
+A residue's gcd with N is the gcd of its value with N in every backend,
+since R is a unit for odd N. So stage 1 can take products of raw residues.
+ring(N, "auto") times the available backends once per bit length and uses
+the fastest.
+
+The kernels below (binary conic and Lucas ladders, the Montgomery curve
+ladder) are the conic_kernel and montgomery_ecm ones written against a ring
+context, for running the methods on a chosen backend.
+"""
+import time
+from functools import lru_cache
+from math import gcd
+
+from conic_kernel import mpz
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+class IntRing:
+    """
+    Z/NZ on Python ints
+    """
+    name = "int"
+
+    def __init__(self, N):
+        self.N = int(N)
+        self.one = self.element(1)
+        self.zero = self.element(0)
+
+    def element(self, v):
+        return int(v) % self.N
+
+    def value(self, a):
+        return int(a)
+
+    def add(self, a, b):
+        return (a + b) % self.N
+
+    def sub(self, a, b):
+        return (a - b) % self.N
+
+    def mul(self, a, b):
+        return a * b % self.N
+
+    def sqr(self, a):
+        return a * a % self.N
+
+    def inv(self, a):
+        """
+        a^-1, raising ZeroDivisionError if a is not a unit
+        """
+        return pow(a, -1, self.N)
+
+    def powmod(self, a, e):
+        return pow(a, int(e), self.N)
+
+    def gcd(self, a):
+        return gcd(int(a), self.N)
+
+
+class GmpyRing(IntRing):
+    """
+    Z/NZ on gmpy2 mpz
+    """
+    name = "gmpy2"
+
+    def __init__(self, N):
+        if gmpy2 is None:
+            raise ImportError("The gmpy2 backend needs gmpy2")
+        self.N = gmpy2.mpz(int(N))
+        self.one = self.element(1)
+        self.zero = self.element(0)
+
+    def element(self, v):
+        return gmpy2.mpz(int(v)) % self.N
+
+    def inv(self, a):
+        return gmpy2.invert(a, self.N)
+
+    def powmod(self, a, e):
+        return gmpy2.powmod(a, int(e), self.N)
+
+    def gcd(self, a):
+        return int(gmpy2.gcd(a, self.N))
+
+
+class MontgomeryRing(IntRing):
+    """
+    Z/NZ on Montgomery residues a*R mod N, multiplied with REDC
+    """
+    name = "montgomery"
+
+    def __init__(self, N):
+        N = int(N)
+        if N % 2 == 0:
+            raise ValueError("Montgomery form needs an odd modulus")
+        self.k = N.bit_length()
+        self.mask = mpz((1 << self.k) - 1)
+        self.N = mpz(N)
+        self.N_prime = mpz(-pow(N, -1, 1 << self.k) % (1 << self.k))  # -N^-1 mod R
+        self.R2 = mpz((1 << (2 * self.k)) % N)
+        self.one = self.element(1)
+        self.zero = self.element(0)
+
+    def redc(self, T):
+        """
+        T * R^-1 mod N for 0 <= T < N*R
+        """
+        m = (T & self.mask) * self.N_prime & self.mask
+        t = (T + m * self.N) >> self.k
+        return t - self.N if t >= self.N else t
+
+    def element(self, v):
+        return self.redc(mpz(int(v) % int(self.N)) * self.R2)
+
+    def value(self, a):
+        return int(self.redc(a))
+
+    def mul(self, a, b):
+        return self.redc(a * b)
+
+    def sqr(self, a):
+        return self.redc(a * a)
+
+    def inv(self, a):
+        # a = x*R, pow(a, -1, N) = x^-1 * R^-1, times R^2 gives x^-1 * R
+        return pow(int(a), -1, int(self.N)) * self.R2 % self.N
+
+    def powmod(self, a, e):
+        e = int(e)
+        if e == 0:
+            return self.one
+        r = a
+        for i in range(e.bit_length() - 2, -1, -1):
+            r = self.redc(r * r)
+            if (e >> i) & 1:
+                r = self.redc(r * a)
+        return r
+
+
+class SageRing(IntRing):
+    """
+    Z/NZ on Sage Integers(N) elements
+    """
+    name = "sage"
+
+    def __init__(self, N):
+        from sage.all import Integers
+        self.N = int(N)
+        self.R = Integers(self.N)
+        self.one = self.R(1)
+        self.zero = self.R(0)
+
+    def element(self, v):
+        return self.R(int(v))
+
+    def add(self, a, b):
+        return a + b
+
+    def sub(self, a, b):
+        return a - b
+
+    def mul(self, a, b):
+        return a * b
+
+    def sqr(self, a):
+        return a * a
+
+    def inv(self, a):
+        return ~a
+
+    def powmod(self, a, e):
+        return a ** int(e)
+
+
+BACKENDS = {"int": IntRing, "gmpy2": GmpyRing, "montgomery": MontgomeryRing, "sage": SageRing}
+
+
+def _workload(R):
+    """
+    A fixed mix of powerings and products, the timing load of fastest_backend
+    """
+    a = R.element(3)
+    for e in range(1 << 20, (1 << 20) + 64):
+        a = R.mul(R.powmod(a, e), R.add(a, R.one))
+    return a
+
+
+@lru_cache(maxsize=None)
+def _fastest(bits, backends):
+    N = (1 << (bits - 1)) | 1
+    best, best_time = None, None
+    for name in backends:
+        try:
+            R = BACKENDS[name](N)
+        except ImportError:
+            continue
+        _workload(R)  # warm up
+        start = time.perf_counter()
+        _workload(R)
+        elapsed = time.perf_counter() - start
+        if best_time is None or elapsed < best_time:
+            best, best_time = name, elapsed
+    return best
+
+
+def fastest_backend(N, backends=("int", "gmpy2", "montgomery", "sage")):
+    """
+    Name of the fastest available backend for moduli of N's bit length
+    (timed once per bit length)
+    """
+    return _fastest(int(N).bit_length(), tuple(backends))
+
+
+def ring(N, backend="int"):
+    """
+    Ring context for Z/NZ, backend one of BACKENDS or "auto"
+    """
+    if backend == "auto":
+        backend = fastest_backend(N)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    return BACKENDS[backend](N)
+
+
+def ring_state(R, state):
+    """
+    A native state (an int or nested tuples of ints) with its residues in R
+    """
+    if isinstance(state, tuple):
+        return tuple(ring_state(R, v) for v in state)
+    return R.element(state)
+
+
+def ring_conic_mul(R, n, P, d):
+    """
+    n*P on x^2 - d*y^2 = 1, as conic_kernel.conic_mul
+    """
+    n = int(n)
+    if n == 0:
+        return R.one, R.zero
+
+    x, y = P
+    rx, ry = x, y
+    for i in range(n.bit_length() - 2, -1, -1):
+        rx, ry = R.add(R.sqr(rx), R.mul(d, R.sqr(ry))), R.mul(R.add(rx, rx), ry)
+        if (n >> i) & 1:
+            rx, ry = R.add(R.mul(rx, x), R.mul(d, R.mul(ry, y))), R.add(R.mul(rx, y), R.mul(ry, x))
+    return rx, ry
+
+
+def ring_lucas_x_mul(R, n, x):
+    """
+    x-coordinate of n*P from x alone, as conic_kernel.lucas_x_mul
+    """
+    n = int(n)
+    if n == 0:
+        return R.one
+
+    def twice(a):
+        return R.add(a, a)
+
+    x0, x1 = x, R.sub(twice(R.sqr(x)), R.one)
+    for i in range(n.bit_length() - 2, -1, -1):
+        if (n >> i) & 1:
+            x0, x1 = R.sub(twice(R.mul(x0, x1)), x), R.sub(twice(R.sqr(x1)), R.one)
+        else:
+            x0, x1 = R.sub(twice(R.sqr(x0)), R.one), R.sub(twice(R.mul(x0, x1)), x)
+    return x0
+
+
+def ring_x_double(R, P, a24):
+    X, Z = P
+    s = R.sqr(R.add(X, Z))
+    d = R.sqr(R.sub(X, Z))
+    t = R.sub(s, d)
+    return R.mul(s, d), R.mul(t, R.add(d, R.mul(a24, t)))
+
+
+def ring_x_add(R, P, Q, diff):
+    XP, ZP = P
+    XQ, ZQ = Q
+    u = R.mul(R.sub(XP, ZP), R.add(XQ, ZQ))
+    v = R.mul(R.add(XP, ZP), R.sub(XQ, ZQ))
+    return R.mul(diff[1], R.sqr(R.add(u, v))), R.mul(diff[0], R.sqr(R.sub(u, v)))
+
+
+def ring_ladder(R, n, P, a24):
+    """
+    Montgomery ladder for n*P on X:Z, as montgomery_ecm.ladder
+    """
+    n = int(n)
+    if n == 0:
+        return R.one, R.zero
+
+    R0, R1 = P, ring_x_double(R, P, a24)
+    for i in range(n.bit_length() - 2, -1, -1):
+        if (n >> i) & 1:
+            R0, R1 = ring_x_add(R, R1, R0, P), ring_x_double(R, R1, a24)
+        else:
+            R0, R1 = ring_x_double(R, R0, a24), ring_x_add(R, R1, R0, P)
+    return R0
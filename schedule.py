@@ -0,0 +1,97 @@
+"""
+Stage 1 exponent schedules shared by all methods.
+
+A schedule lists (l, e, l^e) for every prime l <= B. Exponents are chosen
+with exact integer arithmetic according to a policy:
+- "N":     smallest e with l^e >= 2^bits(N) (>= N, the original choice)
+- "sqrtN": smallest e with l^e >= 2^ceil(bits(N)/2), enough since every
+           factor we look for is at most sqrt(N)
+- "B":     largest e with l^e <= B, i.e. floor(log_l B)
+Schedules only depend on (B, bit length of N, policy), so they are built
+once and shared by every trial and every method.
+"""
+from functools import lru_cache
+
+POLICIES = ("N", "sqrtN", "B")
+
+
+def primes_up_to(n):
+    """
+    All primes <= n (sieve of Eratosthenes)
+    """
+    n = int(n)
+    if n < 2:
+        return []
+    sieve = bytearray([1]) * (n + 1)
+    sieve[0] = sieve[1] = 0
+    for i in range(2, int(n**0.5) + 1):
+        if sieve[i]:
+            sieve[i*i::i] = bytearray(len(range(i*i, n + 1, i)))
+    return [i for i in range(n + 1) if sieve[i]]
+
+
+def _smallest_power_at_least(l, bound):
+    """
+    Smallest e >= 1 with l^e >= bound, and l^e
+    """
+    e, power = 1, l
+    while power < bound:
+        e += 1
+        power *= l
+    return e, power
+
+
+def _largest_power_at_most(l, bound):
+    """
+    Largest e >= 1 with l^e <= bound, and l^e
+    """
+    e, power = 1, l
+    while power * l <= bound:
+        e += 1
+        power *= l
+    return e, power
+
+
+class Schedule:
+    """
+    Precomputed (prime, exponent, prime power) triples for one (B, bits, policy)
+    """
+
+    def __init__(self, B, bits, policy):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown exponent policy: {policy}")
+        self.B = B
+        self.bits = bits
+        self.policy = policy
+
+        triples = []
+        for l in primes_up_to(B):
+            if policy == "N":
+                e, power = _smallest_power_at_least(l, 1 << bits)
+            elif policy == "sqrtN":
+                e, power = _smallest_power_at_least(l, 1 << ((bits + 1) // 2))
+            else:
+                e, power = _largest_power_at_most(l, B)
+            triples.append((l, e, power))
+
+        self.triples = tuple(triples)
+        self.primes = tuple(l for l, _, _ in triples)
+        self.prime_powers = tuple(power for _, _, power in triples)
+
+    def __len__(self):
+        return len(self.triples)
+
+    def __iter__(self):
+        return iter(self.triples)
+
+
+@lru_cache(maxsize=None)
+def _cached_schedule(B, bits, policy):
+    return Schedule(B, bits, policy)
+
+
+def stage1_schedule(N, B, policy="N"):
+    """
+    Shared stage 1 schedule for factoring N with bound B
+    """
+    return _cached_schedule(int(B), int(N).bit_length(), policy)
@@ -0,0 +1,85 @@
+"""
+Constructive generation of primes with a chosen p +- 1 smoothness profile.
+
+Instead of drawing random primes until p + 1 (or p - 1) happens to be
+B-smooth, m = p +- 1 is assembled as a product of random primes <= B and
+p = m -+ 1 is tested for primality. The profile can also fix
+- the range of the largest prime factor of m, or
+- exactly one large prime r in a given range above B (m = r * B-smooth),
+  for stage 2 studies.
+"""
+import random
+from bisect import bisect_left, bisect_right
+
+from number_theory import is_probable_prime
+from schedule import primes_up_to
+
+KINDS = ("p-1", "p+1")
+
+
+def _random_prime_in(lo, hi, rng):
+    """
+    Random prime in [lo, hi] (None if there is none after a fair search)
+    """
+    lo = max(lo, 2)
+    if hi < lo:
+        return None
+    for _ in range(64 * max(1, hi.bit_length())):
+        r = rng.randint(lo, hi)
+        if is_probable_prime(r):
+            return r
+    return None
+
+
+def smooth_prime(bits, B, kind="p+1", largest=None, large_prime=None, rng=random, max_tries=100000):
+    """
+    Random prime p of exactly `bits` bits with m = p + 1 (kind "p+1") or
+    m = p - 1 (kind "p-1") of the form 2 * (primes <= B):
+    - largest=(lo, hi): the largest prime factor of the B-smooth part lies
+      in [lo, hi] (hi <= B)
+    - large_prime=(lo, hi): m additionally has exactly one prime factor r in
+      [lo, hi], typically B < lo <= hi <= B2
+    rng is a random.Random-like generator (the module's global one by default).
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind: {kind}")
+    bits, B = int(bits), int(B)
+    pool = primes_up_to(B)
+    if not pool:
+        raise ValueError("B must be at least 2")
+    low, high = 1 << (bits - 1), (1 << bits) - 1
+    shift = 1 if kind == "p+1" else -1  # p = m - shift
+
+    for _ in range(max_tries):
+        m = 2
+        cap = B
+        if largest is not None:
+            lo, hi = largest
+            i, j = bisect_left(pool, lo), bisect_right(pool, min(hi, B))
+            if i >= j:
+                raise ValueError(f"No prime <= B in the largest factor range {largest}")
+            cap = pool[rng.randrange(i, j)]
+            m *= cap
+        if large_prime is not None:
+            r = _random_prime_in(int(large_prime[0]), int(large_prime[1]), rng)
+            if r is None:
+                raise ValueError(f"No prime found in {large_prime}")
+            m *= r
+        top = bisect_right(pool, cap)
+
+        # Multiply random primes <= cap until one last prime can land m*l in
+        # the target interval, then try that prime
+        while m <= high:
+            lo_l = -(-(low + shift) // m)
+            hi_l = (high + shift) // m
+            if hi_l <= cap:
+                i, j = bisect_left(pool, max(lo_l, 2)), bisect_right(pool, hi_l)
+                if i < j:
+                    m *= pool[rng.randrange(i, j)]
+                break
+            m *= pool[rng.randrange(top)]
+
+        p = m - shift
+        if low <= p <= high and is_probable_prime(p):
+            return p
+    raise ValueError(f"No {bits}-bit prime with this profile after {max_tries} tries")
@@ -0,0 +1,164 @@
+"""
+Shared stage 1 driver for the group factoring methods.
+
+Each method supplies its starting state, a step function that multiplies the
+state by one prime power and a residue function giving the value whose gcd
+with N exposes a factor (x - 1 on the conic, b - 1 for Pollard, ...).
+Residues are multiplied into an accumulator and one gcd is taken per block
+of primes instead of one per prime.
+"""
+from math import gcd
+
+from op_counter import counted
+from schedule import stage1_schedule
+
+DEFAULT_BATCH = 64
+
+
+def run_stage1(N, state, exponents, step, residue, batch=DEFAULT_BATCH, counter=None, cost=None):
+    """
+    Run state = step(state, E) for every prime power E in exponents.
+    Every `batch` primes, gcd(product of residues, N) is checked. If it comes
+    back as N, the block is replayed from its starting state one prime at a
+    time so that two factors caught in the same block are still separated.
+    If residue is None the states are only advanced (no gcd is taken).
+    With an OpCounter, every step is charged cost(counter, E) and the
+    accumulator products and gcds are counted under "stage1".
+    Returns (g, state): g is a nontrivial factor, N if both factors appeared
+    at the same prime, or 1 if nothing was found.
+    """
+    N = int(N)
+    exponents = list(exponents)
+    if counter is not None:
+        counter.stage = "stage1"
+        step = counted(step, counter, cost)
+
+    if residue is None:
+        for E in exponents:
+            state = step(state, E)
+        return 1, state
+
+    for start in range(0, len(exponents), batch):
+        block = exponents[start:start + batch]
+        checkpoint = state
+
+        acc = 1
+        for E in block:
+            state = step(state, E)
+            acc = acc * int(residue(state)) % N
+
+        g = gcd(acc, N)
+        if counter is not None:
+            counter.count(mul=len(block), gcd=1)
+        if g == 1:
+            continue
+        if g != N:
+            return g, state
+
+        # Both factors showed up inside this block, replay it prime by prime
+        state = checkpoint
+        for E in block:
+            state = step(state, E)
+            g = gcd(int(residue(state)), N)
+            if counter is not None:
+                counter.count(gcd=1)
+            if g != 1:
+                return g, state
+
+    return 1, state
+
+
+def run_stage1_lockstep(N, states, exponents, step, residue, batch=DEFAULT_BATCH):
+    """
+    Advance k independent starting states (trials) through the same prime
+    powers together. The residues of every trial are folded into a single
+    product, so each block of `batch` primes costs one gcd for all trials.
+    On a block gcd of N the block is replayed prime by prime and trial by
+    trial; a trial whose own gcd is N is dropped from later blocks.
+    Returns (g, i, states): g a nontrivial factor found by trial i (0-based),
+    or (1, None, states) if no trial succeeded.
+    """
+    N = int(N)
+    exponents = list(exponents)
+    states = list(states)
+    active = list(range(len(states)))
+
+    for start in range(0, len(exponents), batch):
+        if not active:
+            break
+        block = exponents[start:start + batch]
+        checkpoint = list(states)
+
+        acc = 1
+        for E in block:
+            for i in active:
+                states[i] = step(states[i], E)
+                acc = acc * int(residue(states[i])) % N
+
+        g = gcd(acc, N)
+        if g == 1:
+            continue
+        if g != N:
+            # Only one factor in the product, find the trial that holds it
+            for i in active:
+                g = gcd(int(residue(states[i])), N)
+                if g != 1:
+                    return g, i, states
+
+        # Replay the block prime by prime, trial by trial
+        states = checkpoint
+        dead = set()
+        for E in block:
+            for i in active:
+                if i in dead:
+                    continue
+                states[i] = step(states[i], E)
+                g = gcd(int(residue(states[i])), N)
+                if g == N:
+                    dead.add(i)
+                elif g != 1:
+                    return g, i, states
+        active = [i for i in active if i not in dead]
+
+    return 1, None, states
+
+
+class ResumableStage1:
+    """
+    Stage 1 of one trial that can be extended from a bound B_prev to a larger
+    B_next by processing only the primes in (B_prev, B_next].
+    Holds the current state and the index of the next prime in the schedule.
+    Only policies whose exponents do not depend on B ("N", "sqrtN") give
+    schedules that extend each other.
+    """
+
+    def __init__(self, N, state, step, residue, policy="N", batch=DEFAULT_BATCH):
+        if policy == "B":
+            raise ValueError("Exponents of policy 'B' change with B, stage 1 cannot be resumed")
+        self.N = N
+        self.state = state
+        self.step = step
+        self.residue = residue
+        self.policy = policy
+        self.batch = batch
+        self.index = 0
+        self.B = 1
+        self.result = None  # nontrivial factor, or N once both factors collapsed
+
+    def extend(self, B):
+        """
+        Run stage 1 up to bound B. Returns the factor found so far (possibly
+        N, a failed trial) or None if nothing has been found yet.
+        """
+        if self.result is not None or B <= self.B:
+            return self.result
+
+        schedule = stage1_schedule(self.N, B, self.policy)
+        exponents = schedule.prime_powers[self.index:]
+        g, self.state = run_stage1(self.N, self.state, exponents, self.step,
+                                   self.residue, batch=self.batch)
+        self.index = len(schedule)
+        self.B = B
+        if g != 1:
+            self.result = g
+        return self.result
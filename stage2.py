@@ -0,0 +1,113 @@
+"""
+Stage 2 (one large prime) continuation shared by the Pell, Williams and
+Pollard methods.
+
+All three reduce to a Chebyshev/Lucas sequence: for a stage 1 element g of
+the group, x_n = (g^n + g^-n)/2 satisfies x_{2n} = 2*x_n^2 - 1 and
+x_{m+n} = 2*x_m*x_n - x_{m-n}. On the conic x_n is the x-coordinate of n*P,
+for Pollard g is b = a^M mod N. Since x_m = x_n (mod p) exactly when
+m = +-n modulo the order of g mod p, a prime q = k*D +- j is caught by a
+single factor x_{kD} - x_j of the accumulated product.
+"""
+from math import gcd
+
+from conic_kernel import mpz, lucas_x_mul
+from stage1 import DEFAULT_BATCH
+
+# Candidate giant-step widths, each one a primorial
+_PRIMORIALS = [(2, 2), (6, 3), (30, 5), (210, 7), (2310, 11), (30030, 13)]
+
+
+def _giant_step(q_min, q_max):
+    """
+    Largest primorial D with D^2 <= q_max whose prime factors are all below
+    q_min, so that every prime q >= q_min is coprime to D
+    """
+    D = 2
+    for value, largest in _PRIMORIALS:
+        if largest < q_min and value * value <= q_max:
+            D = value
+    return D
+
+
+def run_stage2(N, x, primes, batch=DEFAULT_BATCH, counter=None):
+    """
+    Baby-step/giant-step stage 2 over the primes q in `primes` (all above B).
+    x is the x-coordinate (Chebyshev value) of the stage 1 element.
+    Baby steps x_j for odd j < D/2 coprime to D are precomputed, giant steps
+    x_{kD} are walked with x_{(k+1)D} = 2*x_{kD}*x_D - x_{(k-1)D}.
+    Products of x_{kD} - x_j are folded into one gcd every `batch` giant
+    steps; a block gcd equal to N is replayed prime by prime.
+    With an OpCounter the work is counted under "stage2".
+    Returns g: a nontrivial factor, N (both factors caught by the same q)
+    or 1.
+    """
+    N = int(N)
+    primes = sorted(int(q) for q in primes)
+    if not primes:
+        return 1
+    n = mpz(N)
+    x = mpz(int(x) % N)
+
+    D = _giant_step(primes[0], primes[-1])
+    if counter is not None:
+        counter.stage = "stage2"
+
+    # Pair each prime with its giant step k and baby step j, q = k*D +- j
+    steps = {}
+    for q in primes:
+        k = (q + D // 2) // D
+        steps.setdefault(k, []).append(abs(q - k*D))
+
+    # Baby steps: x_j for odd j <= D/2, walking x_{j+2} = 2*x_j*x_2 - x_{j-2}
+    x2 = (2*x*x - 1) % n
+    baby = {0: mpz(1), 1: x}
+    prev, cur = x, x  # x_{-1} = x_1
+    for j in range(3, D // 2 + 1, 2):
+        prev, cur = cur, (2*cur*x2 - prev) % n
+        baby[j] = cur
+    if counter is not None:
+        counter.count(sqr=1, mul=len(baby) - 2)
+
+    # Giant steps
+    k_first, k_last = min(steps), max(steps)
+    xD = lucas_x_mul(D, x, n)
+    x_prev = lucas_x_mul(abs(k_first - 1) * D, x, n)  # x_{-n} = x_n
+    x_cur = lucas_x_mul(k_first * D, x, n)
+    if counter is not None:
+        for m in (D, abs(k_first - 1) * D, k_first * D):
+            counter.lucas_x_mul(m)
+
+    block = []
+    acc = 1
+    k_block = k_first
+    for k in range(k_first, k_last + 1):
+        if k in steps:
+            block.append((k, x_cur))
+            for j in steps[k]:
+                acc = acc * (x_cur - baby[j]) % n
+
+        if len(block) == batch or k == k_last:
+            g = gcd(int(acc), N)
+            if counter is not None:
+                # one giant step product per k, one accumulator product per prime
+                primes_in_block = sum(len(steps[kb]) for kb, _ in block)
+                counter.count(add=k - k_block + 1, mul=k - k_block + 1 + primes_in_block, gcd=1)
+                k_block = k + 1
+            if g == N:
+                # Both factors in this block, replay it prime by prime
+                for kb, xk in block:
+                    for j in steps[kb]:
+                        g = gcd(int(xk - baby[j]), N)
+                        if counter is not None:
+                            counter.count(gcd=1)
+                        if g != 1:
+                            return g
+            if g != 1:
+                return g
+            block = []
+            acc = 1
+
+        x_prev, x_cur = x_cur, (2*x_cur*xD - x_prev) % n
+
+    return 1
@@ -0,0 +1,258 @@
+"""
+Vectorised stage 1 for many small moduli at once (odd N < 2^62).
+
+Every N is a lane of a uint64 numpy array, and so is its state. All lanes
+go through the same prime schedule together, so one numpy operation does a
+step for thousands of trials and the Python overhead per operation is paid
+once per array instead of once per N.
+
+Residues are kept in Montgomery form a*2^64 mod N. The 128-bit product of
+two residues is assembled from 32-bit limbs (four uint64 partial products),
+and REDC divides by 2^64 with wrapping uint64 arithmetic:
+
+    T = a*b,  m = (T mod 2^64) * N^-1 mod 2^64,  (T - m*N) / 2^64 in (-N, N)
+
+With N < 2^62 every intermediate fits in 64 bits. Montgomery residues share
+their gcd with N, so the gcd checkpoints of stage1.run_stage1 run directly
+on them, and a block whose gcd is N is replayed prime by prime for the lanes
+concerned. The methods return a factor array with 0 for failed lanes.
+"""
+import numpy as np
+
+from schedule import stage1_schedule
+from stage1 import DEFAULT_BATCH
+
+MAX_MODULUS = 1 << 62
+CHUNK = 4096  # lanes per array: larger arrays fall out of cache
+_M32 = np.uint64(0xFFFFFFFF)
+_S32 = np.uint64(32)
+
+
+def _mul_hi(a, b):
+    """
+    High 64 bits of the 128-bit products a*b
+    """
+    a0, a1 = a & _M32, a >> _S32
+    b0, b1 = b & _M32, b >> _S32
+    p00, p01, p10 = a0 * b0, a0 * b1, a1 * b0
+    mid = (p00 >> _S32) + (p01 & _M32) + (p10 & _M32)
+    return a1 * b1 + (p01 >> _S32) + (p10 >> _S32) + (mid >> _S32)
+
+
+def _sqr_hi(a):
+    """
+    High 64 bits of the 128-bit squares a*a
+    """
+    a0, a1 = a & _M32, a >> _S32
+    p00, p01 = a0 * a0, a0 * a1
+    mid = (p00 >> _S32) + ((p01 & _M32) << np.uint64(1))
+    return a1 * a1 + ((p01 >> _S32) << np.uint64(1)) + (mid >> _S32)
+
+
+class VectorMontgomery:
+    """
+    Montgomery arithmetic mod an array of odd N < 2^62, lane by lane.
+    Reductions into [0, N) use np.minimum(t, t - N) (or t + N): the wrong
+    candidate has wrapped around to a value above 2^63.
+    """
+
+    def __init__(self, N):
+        N = np.asarray(N, dtype=np.uint64)
+        self.N = N
+        # N^-1 mod 2^64 by Newton's iteration, N*N = 1 mod 8 gives 3 bits
+        inv = N.copy()
+        for _ in range(5):
+            inv = inv * (np.uint64(2) - N * inv)
+        self.N_inv = inv
+        # 2^64 mod N, then 2^128 mod N by 64 modular doublings
+        self.one = (np.uint64(0) - N) % N
+        r2 = self.one.copy()
+        for _ in range(64):
+            r2 = self.add(r2, r2)
+        self.r2 = r2
+
+    def take(self, lanes):
+        """
+        Context for a subset of the lanes (index or boolean array)
+        """
+        sub = object.__new__(VectorMontgomery)
+        sub.N, sub.N_inv = self.N[lanes], self.N_inv[lanes]
+        sub.one, sub.r2 = self.one[lanes], self.r2[lanes]
+        return sub
+
+    def _redc(self, hi, lo):
+        # m*N has the same low word as T = hi*2^64 + lo, so (T - m*N)/2^64
+        # is hi - hi(m*N), in (-N, N)
+        t = hi - _mul_hi(lo * self.N_inv, self.N)
+        return np.minimum(t, t + self.N)
+
+    def mul(self, a, b):
+        return self._redc(_mul_hi(a, b), a * b)
+
+    def sqr(self, a):
+        return self._redc(_sqr_hi(a), a * a)
+
+    def add(self, a, b):
+        t = a + b
+        return np.minimum(t, t - self.N)
+
+    def sub(self, a, b):
+        t = a - b
+        return np.minimum(t, t + self.N)
+
+    def to_mont(self, a):
+        return self.mul(np.asarray(a, dtype=np.uint64) % self.N, self.r2)
+
+    def from_mont(self, a):
+        return self.mul(a, np.ones_like(a))
+
+    def pow(self, a, e):
+        """
+        a^e for one exponent e shared by all lanes
+        """
+        e = int(e)
+        if e == 0:
+            return self.one.copy()
+        r = a
+        for i in range(e.bit_length() - 2, -1, -1):
+            r = self.sqr(r)
+            if (e >> i) & 1:
+                r = self.mul(r, a)
+        return r
+
+    def lucas_x(self, x, e):
+        """
+        x_e of the Chebyshev/Lucas sequence (x-coordinate of e*P on the
+        conic) by the ladder of conic_kernel.lucas_x_mul
+        """
+        e = int(e)
+        if e == 0:
+            return self.one.copy()
+
+        def twice_minus(a, b):
+            t = self.add(a, a)
+            return self.sub(t, b)
+
+        x0, x1 = x, twice_minus(self.sqr(x), self.one)
+        for i in range(e.bit_length() - 2, -1, -1):
+            if (e >> i) & 1:
+                x0, x1 = twice_minus(self.mul(x0, x1), x), twice_minus(self.sqr(x1), self.one)
+            else:
+                x0, x1 = twice_minus(self.sqr(x0), self.one), twice_minus(self.mul(x0, x1), x)
+        return x0
+
+
+def moduli(N):
+    """
+    N as a uint64 array, checking that every N is odd and below 2^62
+    """
+    values = [int(n) for n in N]
+    if any(n >= MAX_MODULUS or n < 3 or n % 2 == 0 for n in values):
+        raise ValueError("The vector engine needs odd moduli 3 <= N < 2^62")
+    return np.array(values, dtype=np.uint64)
+
+
+def run_stage1_vector(ctx, state, exponents, step, residue, batch=DEFAULT_BATCH):
+    """
+    stage1.run_stage1 for all lanes at once: state = step(ctx, state, E),
+    one gcd of the residue products per block of `batch` primes, and a
+    prime-by-prime replay of the block for lanes whose gcd is N.
+    Lanes that found something leave the arrays.
+    Returns the array of results: a nontrivial factor, N (both factors at
+    the same prime) or 1.
+    """
+    result = np.ones(len(ctx.N), dtype=np.uint64)
+    active = np.arange(len(ctx.N))
+    exponents = list(exponents)
+
+    for start in range(0, len(exponents), batch):
+        if len(active) == 0:
+            break
+        block = exponents[start:start + batch]
+        checkpoint = state
+
+        acc = ctx.one
+        for E in block:
+            state = step(ctx, state, E)
+            acc = ctx.mul(acc, residue(ctx, state))
+        g = np.gcd(acc, ctx.N)
+        result[active] = g
+
+        both = g == ctx.N
+        if both.any():
+            # Replay the block prime by prime for those lanes, keeping the
+            # first gcd that is not 1
+            sub = ctx.take(both)
+            s, first = checkpoint[both], np.ones(int(both.sum()), dtype=np.uint64)
+            for E in block:
+                s = step(sub, s, E)
+                gcds = np.gcd(residue(sub, s), sub.N)
+                first = np.where(first == 1, gcds, first)
+            result[active[both]] = first
+
+        keep = g == 1
+        state, ctx, active = state[keep], ctx.take(keep), active[keep]
+
+    return result
+
+
+def run_lanes(N, start, exponents, step, residue, batch=DEFAULT_BATCH, chunk=CHUNK):
+    """
+    run_stage1_vector from the integer starting values `start`, `chunk`
+    lanes at a time
+    """
+    result = np.empty_like(N)
+    for i in range(0, len(N), chunk):
+        ctx = VectorMontgomery(N[i:i + chunk])
+        result[i:i + chunk] = run_stage1_vector(ctx, ctx.to_mont(start[i:i + chunk]),
+                                                exponents, step, residue, batch)
+    return result
+
+
+def _draw(N, rng):
+    return rng.integers(1, N, dtype=np.uint64)
+
+
+def _factors(N, result, setup):
+    """
+    Factor array: nontrivial results, setup gcds where setup found one,
+    0 for failed lanes
+    """
+    found = np.where((result != 1) & (result != N), result, np.uint64(0))
+    return np.where(setup != 1, setup, found)
+
+
+def pollard_vector(N, B, policy="N", batch=DEFAULT_BATCH, seed=None, chunk=CHUNK):
+    """
+    One pollard_method stage 1 trial (random base a) per N, all with the
+    schedule of the largest N.
+    Returns the factor array (0 where the trial failed).
+    """
+    N = moduli(N)
+    rng = np.random.default_rng(seed)
+    a = _draw(N, rng)
+    setup = np.gcd(a, N)
+
+    exponents = stage1_schedule(int(N.max()), B, policy).prime_powers
+    result = run_lanes(N, a, exponents, lambda ctx, b, E: ctx.pow(b, E),
+                       lambda ctx, b: ctx.sub(b, ctx.one), batch, chunk)
+    return _factors(N, result, setup)
+
+
+def pell_vector(N, B, policy="N", batch=DEFAULT_BATCH, seed=None, chunk=CHUNK):
+    """
+    One x-only pell_method stage 1 trial per N, from the x-coordinate a of a
+    random point (a, b) (the conic's d = (a^2 - 1)/b^2 is never needed), all
+    with the schedule of the largest N.
+    Returns the factor array (0 where the trial failed).
+    """
+    N = moduli(N)
+    rng = np.random.default_rng(seed)
+    a, b = _draw(N, rng), _draw(N, rng)
+    setup = np.gcd(a, N)
+    setup = np.where(setup != 1, setup, np.gcd(b, N))
+
+    exponents = stage1_schedule(int(N.max()), B, policy).prime_powers
+    result = run_lanes(N, a, exponents, lambda ctx, x, E: ctx.lucas_x(x, E),
+                       lambda ctx, x: ctx.sub(x, ctx.one), batch, chunk)
+    return _factors(N, result, setup)